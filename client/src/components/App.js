@@ -11,32 +11,34 @@ function App() {
   const [invoices, setInvoices] = useState([]);
   const [companies, setCompanies] = useState([]);
 
-  // Fetch memos and invoices for the logged-in user when the component mounts
+  // Fetch memos, invoices and companies for the logged-in user in one round
+  // trip; the server runs the three reads concurrently (/api/batch)
   useEffect(() => {
     if (signedIn && user?.id) {
-      // Fetch future memos for the logged-in user
-      fetch(`http://localhost:5555/api/memos/${user.id}/future`)
-        .then((resp) => resp.json())
-        .then((data) => {
-          setMemos(data);
-        })
-        .catch((error) => console.error("Error fetching memos", error));
-
-      // Fetch future invoices for the logged-in user
-      fetch(`http://localhost:5555/api/invoices/${user.id}/future`)
-        .then((resp) => resp.json())
-        .then((data) => {
-          setInvoices(data);
-        })
-        .catch((error) => console.error("Error fetching invoices", error));
-
-      // Fetch companies that user has memos or invoices for
-      fetch(`http://localhost:5555/api/companies/${user.id}`)
+      fetch("/api/batch", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        credentials: "include",
+        body: JSON.stringify({
+          requests: [
+            { id: "memos", method: "GET", path: `/api/memos/${user.id}/future` },
+            { id: "invoices", method: "GET", path: `/api/invoices/${user.id}/future` },
+            { id: "companies", method: "GET", path: `/api/companies/${user.id}` },
+          ],
+        }),
+      })
         .then((resp) => resp.json())
-        .then((data) => {
-          setCompanies(data);
+        .then(({ responses }) => {
+          const setters = { memos: setMemos, invoices: setInvoices, companies: setCompanies };
+          responses.forEach(({ id, status, body }) => {
+            if (status === 200) {
+              setters[id](body);
+            } else {
+              console.error(`Error fetching ${id}`, body);
+            }
+          });
         })
-        .catch((error) => console.error("Error fetching companies", error));
+        .catch((error) => console.error("Error fetching dashboard data", error));
     }
   }, [signedIn, user?.id]);
 
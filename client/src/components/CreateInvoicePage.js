@@ -2,6 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useUser } from "./UserContext"; // Ensure this context provides `signedIn`
+import useCompanySuggestions from "./useCompanySuggestions";
 
 function CreateInvoicePage() {
   const { signedIn } = useUser();  // Check if user is signed in
@@ -18,6 +19,7 @@ function CreateInvoicePage() {
     email: '',
   });
 
+  const companySuggestions = useCompanySuggestions(formValues.company);
   const [loading, setLoading] = useState(false);  // Loading state
   const [error, setError] = useState('');         // Error message
 
@@ -89,10 +91,9 @@ function CreateInvoicePage() {
           <input
             type="text"
             name="invoice_number"
-            placeholder="Enter invoice number"
+            placeholder="Leave blank to assign the next invoice number"
             value={formValues.invoice_number}
             onChange={handleChange}
-            required
           />
         </div>
 
@@ -152,10 +153,17 @@ function CreateInvoicePage() {
             type="text"
             name="company"
             placeholder="Enter company name"
+            list="company-suggestions"
+            autoComplete="off"
             value={formValues.company}
             onChange={handleChange}
             required
           />
+          <datalist id="company-suggestions">
+            {companySuggestions.map((name) => (
+              <option key={name} value={name} />
+            ))}
+          </datalist>
         </div>
 
         {/* Client Email */}
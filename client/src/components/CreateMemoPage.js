@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useUser } from "./UserContext";
+import useCompanySuggestions from "./useCompanySuggestions";
 
 function CreateMemoPage() {
   const { signedIn } = useUser();       // Check if the user is signed in
@@ -19,6 +20,7 @@ function CreateMemoPage() {
     email: '',
   });
 
+  const companySuggestions = useCompanySuggestions(formValues.company);
   const [loading, setLoading] = useState(false);    // Loading state
   const [error, setError] = useState('');           // Error message
 
@@ -89,10 +91,9 @@ function CreateMemoPage() {
           <input
             type="text"
             name="memo_number"
-            placeholder="Enter memo number"
+            placeholder="Leave blank to assign the next memo number"
             value={formValues.memo_number}
             onChange={handleChange}
-            required
           />
         </div>
 
@@ -175,10 +176,17 @@ function CreateMemoPage() {
             type="text"
             name="company"
             placeholder="Enter company name"
+            list="company-suggestions"
+            autoComplete="off"
             value={formValues.company}
             onChange={handleChange}
             required
           />
+          <datalist id="company-suggestions">
+            {companySuggestions.map((name) => (
+              <option key={name} value={name} />
+            ))}
+          </datalist>
         </div>
 
         {/* Client Email */}
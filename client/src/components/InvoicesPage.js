@@ -2,6 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import { useUser } from "./UserContext";
 import { useNavigate, Link } from "react-router-dom";
+import useChangeStream, { applyChange } from "./useChangeStream";
 import '../index.css'; // Import global styles if needed
 
 function InvoicesPage() {
@@ -10,6 +11,7 @@ function InvoicesPage() {
 
   const [invoices, setInvoices] = useState([]);
   const [company, setCompany] = useState('');
+  const [watchedCompany, setWatchedCompany] = useState('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
 
@@ -20,6 +22,11 @@ function InvoicesPage() {
     }
   }, [signedIn, navigate]);
 
+  // Keep the list current from the server's change feed instead of refetching
+  useChangeStream(watchedCompany, (event) => {
+    setInvoices((current) => applyChange(current, event, 'invoice'));
+  });
+
   // Fetch invoices from the backend
   const fetchInvoices = async () => {
     if (!company) {
@@ -38,6 +45,7 @@ function InvoicesPage() {
       }
       const data = await res.json();
       setInvoices(data);
+      setWatchedCompany(company);
     } catch (err) {
       setError('Failed to fetch invoices. Please try again.');
     } finally {
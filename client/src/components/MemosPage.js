@@ -3,6 +3,7 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { useUser } from "./UserContext";       // <-- Import your user context
 import { useNavigate, Link } from "react-router-dom"; // <-- Import useNavigate and Link
+import useChangeStream, { applyChange } from "./useChangeStream";
 import '../index.css'; // Import global styles if needed
 
 function MemosPage() {
@@ -11,6 +12,7 @@ function MemosPage() {
 
   const [memos, setMemos] = useState([]);
   const [company, setCompany] = useState('');
+  const [watchedCompany, setWatchedCompany] = useState('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
 
@@ -21,6 +23,11 @@ function MemosPage() {
     }
   }, [signedIn, navigate]);
 
+  // Keep the list current from the server's change feed instead of refetching
+  useChangeStream(watchedCompany, (event) => {
+    setMemos((current) => applyChange(current, event, 'memo'));
+  });
+
   // Fetch memos from the backend
   const fetchMemos = async () => {
     if (!company) {
@@ -36,6 +43,7 @@ function MemosPage() {
         withCredentials: true, // Include credentials (cookies)
       });
       setMemos(response.data);
+      setWatchedCompany(company);
     } catch (err) {
       setError('Failed to fetch memos. Please try again.');
     } finally {
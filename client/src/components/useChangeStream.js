@@ -0,0 +1,39 @@
+import { useEffect, useRef } from "react";
+
+const STREAM_URL = process.env.REACT_APP_STREAM_URL || "http://localhost:5556";
+
+// Applies a change event from the server to a list of memos or invoices.
+export function applyChange(list, event, entity) {
+  if (event.entity !== entity) {
+    return list;
+  }
+  if (event.op === "created" || event.op === "updated") {
+    const exists = list.some((item) => item.id === event.entity_id);
+    return exists
+      ? list.map((item) => (item.id === event.entity_id ? event.data : item))
+      : [...list, event.data];
+  }
+  return list.filter((item) => item.id !== event.entity_id);
+}
+
+// Subscribes to the server's change feed for a company instead of refetching
+// the whole list. EventSource reconnects on its own and resumes from the last
+// event it received.
+function useChangeStream(company, onChange) {
+  const handler = useRef(onChange);
+  handler.current = onChange;
+
+  useEffect(() => {
+    if (!company) {
+      return undefined;
+    }
+    const source = new EventSource(
+      `${STREAM_URL}/api/stream?company=${encodeURIComponent(company)}`,
+      { withCredentials: true }
+    );
+    source.onmessage = (e) => handler.current(JSON.parse(e.data));
+    return () => source.close();
+  }, [company]);
+}
+
+export default useChangeStream;
@@ -0,0 +1,31 @@
+import { useEffect, useState } from "react";
+
+// Company names starting with `prefix`, from the server's typeahead index.
+// Requests are debounced so typing does not send one per keystroke.
+function useCompanySuggestions(prefix) {
+  const [suggestions, setSuggestions] = useState([]);
+
+  useEffect(() => {
+    if (!prefix.trim()) {
+      setSuggestions([]);
+      return undefined;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      fetch(`/api/companies/suggest?q=${encodeURIComponent(prefix)}`, {
+        signal: controller.signal,
+      })
+        .then((res) => (res.ok ? res.json() : []))
+        .then((companies) => setSuggestions(companies.map((company) => company.name)))
+        .catch(() => {});
+    }, 150);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [prefix]);
+
+  return suggestions;
+}
+
+export default useCompanySuggestions;
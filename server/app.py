@@ -2,23 +2,70 @@
 
 # Standard library imports
 import os
-from flask import request, session, make_response
-from models import User, Memo, Invoice, Category
-from config import app, api, logger, bcrypt, db, mail
+import weakref
+from datetime import datetime, timedelta
+import click
+from flask import Flask, Blueprint, current_app, request, session, make_response, send_file
+from werkzeug.utils import secure_filename
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from models import User, Memo, Invoice, Category, Company, ArchivedMemo, ArchivedInvoice, Attachment
+from config import api, logger, bcrypt, db, PROFILES, DEFAULT_PROFILE
+from archive import include_archived, archived_documents, archived_memo, archived_invoice, archive_command
+from pdf_cache import render_pdf, render_pdfs, invalidate_pdf, zip_pdfs
+from read_cache import memo_reads, invoice_reads
+from entity_cache import entities, requested_ids
+from outbox import record_change
+from numbering import allocator, check_client_number
+from mailer import send_email
+from timeline import InvalidCursor, documents_page
+from convert import ConversionConflict, convert_memos
+from batch import parse_requests, run_batch
+from companies import companies
+from group_commit import WriteTimeout, run_write, insert_document, update_document, writer
+from sync import CursorExpired, changes_since, latest_cursor, prune_command
+from purge import hidden_user_ids, hide_deleted, soft_delete_user, purge_command, delete_category_command
+from attachments import AttachmentTooLarge, save_attachment, blob_path, thumbnail_path, attachments_gc_command
+import attachments
+import limits
+import entity_cache
+import query_budget
 from flask_restful import Resource
-from flask_mail import Message  # For sending emails
 from flask_cors import CORS
 
-# Enable CORS if needed
-CORS(app, supports_credentials=True)
+main = Blueprint('main', __name__)
 
 # Routes and Views
-@app.route('/')
+@main.route('/')
 def index():
     return '<h1>Project Server Running!</h1>'
 
 ### User Management Routes
 
+def _insert_user(values):
+    """
+    Inserts a user in one statement and returns it, or None if the username is
+    taken. The unique index decides, so concurrent signups cannot both pass.
+    """
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        # Only the dialect in use is imported, so cold starts skip the other
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(User).values(**values).on_conflict_do_nothing(index_elements=['username'])
+        return db.session.scalars(statement.returning(User)).first()
+    user = User(**values)
+    try:
+        with db.session.begin_nested():
+            db.session.add(user)
+    except IntegrityError:
+        return None
+    return user
+
+
 class Signup(Resource):
     def post(self):
         params = request.json
@@ -33,21 +80,25 @@ class Signup(Resource):
                 logger.error("Missing required fields in signup request.")
                 return {'error': 'Missing required fields'}, 400
 
-            existing_user = User.query.filter_by(username=username).first()
-            if existing_user:
-                logger.warning(f"Signup attempt failed: Username '{username}' already exists.")
-                return {'error': 'Username already exists'}, 400
+            # Kept in a local so user.to_dict() finds it in the identity map
+            category = db.session.get(Category, category_id)
+            if category is None or category.deleted_at is not None:
+                logger.error(f"Signup attempt with unknown category ID {category_id}.")
+                return {'error': 'Invalid category ID'}, 400
 
             hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-            user = User(
+            user = _insert_user(dict(
                 username=username,
                 password=hashed_password,
                 name=name,
                 lastname=lastname,
                 category_id=category_id
-            )
+            ))
+            if user is None:
+                db.session.rollback()
+                logger.warning(f"Signup attempt failed: Username '{username}' already exists.")
+                return {'error': 'Username already exists'}, 400
 
-            db.session.add(user)
             db.session.commit()
             session['user_id'] = user.id
             logger.info(f"User '{username}' successfully signed up.")
@@ -66,7 +117,7 @@ class CheckSession(Resource):
             user_id = session.get('user_id')
             if user_id:
                 user = db.session.get(User, user_id)
-                if user:
+                if user and user.deleted_at is None:
                     logger.info(f"Session check successful for user ID: {user.id}")
                     return user.to_dict(), 200
             logger.warning("Unauthorized session check attempt.")
@@ -89,7 +140,7 @@ class Login(Resource):
                 logger.warning("Login attempt with missing username or password.")
                 return {'error': 'Username and password are required'}, 400
 
-            user = User.query.filter_by(username=username).first()
+            user = User.query.filter_by(username=username, deleted_at=None).first()
 
             if not user:
                 logger.warning(f"Login attempt failed: User '{username}' not found.")
@@ -122,6 +173,29 @@ class Logout(Resource):
 api.add_resource(Logout, '/logout')
 
 
+class UserByID(Resource):
+    def delete(self, user_id):
+        if session.get('user_id') != user_id:
+            logger.warning(f"Unauthorized attempt to delete user ID {user_id}.")
+            return {'error': 'Unauthorized'}, 403
+
+        try:
+            user = db.session.get(User, user_id)
+            if user is None or user.deleted_at is not None:
+                return {'error': 'User not found'}, 404
+
+            # Hidden right away; memos, invoices and the row itself are removed by `flask purge`
+            soft_delete_user(user)
+            session.pop('user_id', None)
+            logger.info(f"User ID {user_id} deleted; data will be purged in the background.")
+            return {'message': 'User deleted successfully'}, 200
+        except Exception as e:
+            logger.error(f"Error deleting user {user_id}: {e}")
+            return {'error': 'Failed to delete user'}, 500
+
+api.add_resource(UserByID, '/api/users/<int:user_id>')
+
+
 ### Memo Management Routes
 
 class Memos(Resource):
@@ -132,25 +206,21 @@ class Memos(Resource):
                 logger.error("Missing company parameter in memo retrieval request.")
                 return {'error': 'Company parameter is required'}, 400
 
-            memos = Memo.query.filter_by(company=company).all()
-            logger.info(f"Memos retrieved for company: {company}")
+            found = companies.lookup(company)
+            if found is None:
+                return [], 200
+            with_archive = include_archived()
+
+            def load():
+                memos = hide_deleted(Memo.query.filter_by(company_id=found.id), Memo).all()
+                serialized = [memo.to_api_dict() for memo in memos]
+                if with_archive:
+                    serialized.extend(archived_documents(ArchivedMemo, found.name))
+                return serialized
 
-            serialized_memos = []
-            for memo in memos:
-                memo_dict = {
-                    "id": memo.id,
-                    "title": memo.title,
-                    "memo_number": memo.memo_number,
-                    "expiry_date": memo.expiry_date,
-                    "wholesaler_details": memo.wholesaler_details,
-                    "buyer_details": memo.buyer_details,
-                    "items": memo.items,
-                    "total_value": memo.total_value,
-                    "remarks": memo.remarks,
-                    "company": memo.company,
-                    "user_id": memo.user_id,
-                }
-                serialized_memos.append(memo_dict)
+            # Identical concurrent reads share one query (see read_cache.py)
+            serialized_memos = memo_reads.get(found.name, with_archive, load)
+            logger.info(f"Memos retrieved for company: {company}")
 
             return serialized_memos, 200
 
@@ -165,31 +235,35 @@ class Memos(Resource):
 
         data = request.json
         try:
+            company = companies.resolve(data['company'])
+            memo_number = data.get('memo_number')
+            if memo_number:
+                check_client_number('memo', memo_number)
+            else:
+                memo_number = allocator.next_number('memo', company.name)
             new_memo = Memo(
                 title=data['title'],
-                memo_number=data['memo_number'],
+                memo_number=memo_number,
                 expiry_date=data['expiry_date'],
                 wholesaler_details=data['wholesaler_details'],
                 buyer_details=data['buyer_details'],
                 items=data['items'],
                 total_value=data['total_value'],
                 remarks=data.get('remarks', ''),
-                company=data['company'],
+                company=company.name,
+                company_id=company.id,
                 user_id=session['user_id']
             )
-            db.session.add(new_memo)
-            db.session.commit()
+            new_memo = run_write(insert_document, 'memo', new_memo)
+            memo_reads.invalidate(new_memo.company)
             logger.info(f"Memo '{new_memo.title}' created successfully.")
 
             # OPTIONAL: Send Email to client if 'email' is included
             client_email = data.get('email')
             if client_email:
-                msg = Message(
-                    subject="Your Memo Has Been Created",
-                    sender=app.config['MAIL_USERNAME'],
-                    recipients=[client_email]
-                )
-                msg.body = (
+                send_email(
+                    "Your Memo Has Been Created",
+                    [client_email],
                     f"Hello,\n\n"
                     f"Your memo '{new_memo.title}' has been created.\n"
                     f"Memo Number: {new_memo.memo_number}\n"
@@ -197,10 +271,14 @@ class Memos(Resource):
                     f"Items: {new_memo.items}\n"
                     "\nBest,\nOrnaCloud"
                 )
-                mail.send(msg)
                 logger.info(f"Email sent to {client_email} for memo '{new_memo.title}'.")
 
-            return {"message": "Memo created successfully!"}, 201
+            return {"message": "Memo created successfully!", "memo_number": memo_number}, 201
+        except ValueError as e:
+            logger.warning(f"Invalid memo: {e}")
+            return {'error': str(e)}, 400
+        except WriteTimeout:
+            return _write_timeout('memo')
         except Exception as e:
             logger.error(f"Error during memo creation: {e}")
             return {'error': 'Failed to create memo'}, 400
@@ -219,23 +297,21 @@ class Invoices(Resource):
                 logger.error("Missing company parameter in invoice retrieval request.")
                 return {'error': 'Company parameter is required'}, 400
 
-            invoices = Invoice.query.filter_by(company=company).all()
-            logger.info(f"Invoices retrieved for company: {company}")
+            found = companies.lookup(company)
+            if found is None:
+                return [], 200
+            with_archive = include_archived()
+
+            def load():
+                invoices = hide_deleted(Invoice.query.filter_by(company_id=found.id), Invoice).all()
+                serialized = [inv.to_api_dict() for inv in invoices]
+                if with_archive:
+                    serialized.extend(archived_documents(ArchivedInvoice, found.name))
+                return serialized
 
-            serialized_invoices = []
-            for inv in invoices:
-                inv_dict = {
-                    "id": inv.id,
-                    "title": inv.title,
-                    "invoice_number": inv.invoice_number,
-                    "wholesaler_details": inv.wholesaler_details,
-                    "buyer_details": inv.buyer_details,
-                    "items": inv.items,
-                    "total_value": inv.total_value,
-                    "company": inv.company,
-                    "user_id": inv.user_id,
-                }
-                serialized_invoices.append(inv_dict)
+            # Identical concurrent reads share one query (see read_cache.py)
+            serialized_invoices = invoice_reads.get(found.name, with_archive, load)
+            logger.info(f"Invoices retrieved for company: {company}")
 
             return serialized_invoices, 200
 
@@ -250,29 +326,33 @@ class Invoices(Resource):
 
         data = request.json
         try:
+            company = companies.resolve(data['company'])
+            invoice_number = data.get('invoice_number')
+            if invoice_number:
+                check_client_number('invoice', invoice_number)
+            else:
+                invoice_number = allocator.next_number('invoice', company.name)
             new_invoice = Invoice(
                 title=data['title'],
-                invoice_number=data['invoice_number'],
+                invoice_number=invoice_number,
                 wholesaler_details=data['wholesaler_details'],
                 buyer_details=data['buyer_details'],
                 items=data['items'],
                 total_value=data['total_value'],
-                company=data['company'],
+                company=company.name,
+                company_id=company.id,
                 user_id=session['user_id']
             )
-            db.session.add(new_invoice)
-            db.session.commit()
+            new_invoice = run_write(insert_document, 'invoice', new_invoice)
+            invoice_reads.invalidate(new_invoice.company)
             logger.info(f"Invoice '{new_invoice.title}' created successfully.")
 
             # OPTIONAL: Send Email if 'email' included
             client_email = data.get('email')
             if client_email:
-                msg = Message(
-                    subject="Your Invoice Has Been Created",
-                    sender=app.config['MAIL_USERNAME'],
-                    recipients=[client_email]
-                )
-                msg.body = (
+                send_email(
+                    "Your Invoice Has Been Created",
+                    [client_email],
                     f"Hello,\n\n"
                     f"Your invoice '{new_invoice.title}' has been created.\n"
                     f"Invoice Number: {new_invoice.invoice_number}\n"
@@ -281,11 +361,15 @@ class Invoices(Resource):
                     f"Total Value: {new_invoice.total_value}\n"
                     "\nBest,\nOrnaCloud"
                 )
-                mail.send(msg)
                 logger.info(f"Email sent to {client_email} for invoice '{new_invoice.title}'.")
 
-            return {"message": "Invoice created successfully!"}, 201
+            return {"message": "Invoice created successfully!", "invoice_number": invoice_number}, 201
 
+        except ValueError as e:
+            logger.warning(f"Invalid invoice: {e}")
+            return {'error': str(e)}, 400
+        except WriteTimeout:
+            return _write_timeout('invoice')
         except Exception as e:
             logger.error(f"Error during invoice creation: {e}")
             return {'error': 'Failed to create invoice'}, 400
@@ -296,21 +380,39 @@ api.add_resource(Invoices, '/invoices')
 # -----------------------------------------------------------------------
 # Single Invoice Resource (Mirrors MemoByID) - No jsonify() on return
 # -----------------------------------------------------------------------
+def _update_conflict(model, label, document_id):
+    """
+    Answers a PATCH whose UPDATE matched no row: another request changed the
+    document (bumping its version) after this one loaded it. The client gets
+    the current version and should reload before retrying.
+    """
+    db.session.rollback()
+    version = db.session.scalar(select(model.version).where(model.id == document_id))
+    if version is None:
+        return {'error': f"{label} not found"}, 404
+    logger.warning(f"{label} ID {document_id} was updated concurrently; now at version {version}.")
+    return {'error': f"{label} was changed by another request", 'version': version}, 409
+
+
+def _write_timeout(description):
+    """Answers a write that waited too long for group commit and was cancelled unwritten."""
+    logger.warning(f"Write of {description} timed out waiting for group commit.")
+    return {'error': 'Server is busy, please retry'}, 503, {'Retry-After': '1'}
+
+
+# Fields a PATCH may change; company is resolved separately
+INVOICE_FIELDS = ('title', 'invoice_number', 'wholesaler_details', 'buyer_details', 'items', 'total_value')
+
+
 class InvoiceByID(Resource):
     def get(self, invoice_id):
         try:
-            invoice = Invoice.query.get_or_404(invoice_id)
-            inv_dict = {
-                "id": invoice.id,
-                "title": invoice.title,
-                "invoice_number": invoice.invoice_number,
-                "wholesaler_details": invoice.wholesaler_details,
-                "buyer_details": invoice.buyer_details,
-                "items": invoice.items,
-                "total_value": invoice.total_value,
-                "company": invoice.company,
-                "user_id": invoice.user_id,
-            }
+            inv_dict = entities.get(Invoice, invoice_id)
+            if inv_dict is None or inv_dict['user_id'] in hidden_user_ids():
+                archived = archived_invoice(invoice_id) if include_archived() else None
+                if archived:
+                    return archived, 200
+                return {'error': 'Invoice not found'}, 404
             return inv_dict, 200
         except Exception as e:
             logger.error(f"Error retrieving invoice {invoice_id}: {e}")
@@ -327,32 +429,31 @@ class InvoiceByID(Resource):
                 return {'error': 'Unauthorized'}, 403
 
             data = request.json
-            invoice.title = data.get('title', invoice.title)
-            invoice.invoice_number = data.get('invoice_number', invoice.invoice_number)
-            invoice.wholesaler_details = data.get('wholesaler_details', invoice.wholesaler_details)
-            invoice.buyer_details = data.get('buyer_details', invoice.buyer_details)
-            invoice.items = data.get('items', invoice.items)
-            invoice.total_value = data.get('total_value', invoice.total_value)
-            invoice.company = data.get('company', invoice.company)
-
-            db.session.commit()
+            changes = {field: data[field] for field in INVOICE_FIELDS if field in data}
+            if changes.get('invoice_number', invoice.invoice_number) != invoice.invoice_number:
+                check_client_number('invoice', changes['invoice_number'])
+            if 'company' in data:
+                company = companies.resolve(data['company'])
+                changes.update(company=company.name, company_id=company.id)
+
+            invoice, old_company = run_write(update_document, 'invoice', invoice, changes)
+            invoice_reads.invalidate(old_company, invoice.company)
+            entities.put(invoice)
+            invalidate_pdf('invoice', invoice_id)
             logger.info(f"Invoice ID {invoice_id} updated successfully.")
 
-            inv_dict = {
-                "id": invoice.id,
-                "title": invoice.title,
-                "invoice_number": invoice.invoice_number,
-                "wholesaler_details": invoice.wholesaler_details,
-                "buyer_details": invoice.buyer_details,
-                "items": invoice.items,
-                "total_value": invoice.total_value,
-                "company": invoice.company,
-                "user_id": invoice.user_id,
-            }
+            inv_dict = invoice.to_api_dict()
             return {
                 'message': 'Invoice updated successfully',
                 'invoice': inv_dict
             }, 200
+        except ValueError as e:
+            logger.warning(f"Invalid update for invoice {invoice_id}: {e}")
+            return {'error': str(e)}, 400
+        except StaleDataError:
+            return _update_conflict(Invoice, 'Invoice', invoice_id)
+        except WriteTimeout:
+            return _write_timeout(f"invoice {invoice_id}")
         except Exception as e:
             logger.error(f"Error updating invoice {invoice_id}: {e}")
             return {'error': 'Failed to update invoice'}, 500
@@ -367,8 +468,14 @@ class InvoiceByID(Resource):
             if invoice.user_id != session['user_id']:
                 return {'error': 'Unauthorized'}, 403
 
+            company = invoice.company
+            record_change('invoice', 'deleted', invoice)
+            Attachment.query.filter_by(invoice_id=invoice_id).delete(synchronize_session=False)
             db.session.delete(invoice)
             db.session.commit()
+            invoice_reads.invalidate(company)
+            entities.invalidate(Invoice, invoice_id)
+            invalidate_pdf('invoice', invoice_id)
             logger.info(f"Invoice ID {invoice_id} deleted successfully.")
             return {'message': 'Invoice deleted successfully'}, 200
         except Exception as e:
@@ -378,13 +485,32 @@ class InvoiceByID(Resource):
 api.add_resource(InvoiceByID, '/api/invoices/<int:invoice_id>')
 
 
+class InvoiceBatch(Resource):
+    def get(self):
+        try:
+            ids = requested_ids()
+        except ValueError:
+            return {'error': 'ids must be a comma-separated list of up to 200 invoice ids'}, 400
+
+        try:
+            # Cached invoices are served from memory, the rest with one IN query
+            found = entities.get_many(Invoice, ids)
+            hidden = hidden_user_ids()
+            return [found[i] for i in dict.fromkeys(ids) if i in found and found[i]['user_id'] not in hidden], 200
+        except Exception as e:
+            logger.error(f"Error retrieving invoices {ids}: {e}")
+            return {'error': 'Failed to retrieve invoices'}, 500
+
+api.add_resource(InvoiceBatch, '/api/invoices')
+
+
 # -----------------------------------------------------------------------
 # Additional/Existing Routes (unchanged except removing jsonify in returns)
 # -----------------------------------------------------------------------
 class FutureMemos(Resource):
     def get(self, user_id):
         try:
-            memos = Memo.query.filter_by(user_id=user_id).all()
+            memos = hide_deleted(Memo.query.filter_by(user_id=user_id), Memo).all()
             return [m.to_dict() for m in memos], 200
         except Exception as e:
             logger.error(f"Error retrieving future memos for user {user_id}: {e}")
@@ -396,7 +522,7 @@ api.add_resource(FutureMemos, '/api/memos/<int:user_id>/future')
 class FutureInvoices(Resource):
     def get(self, user_id):
         try:
-            invoices = Invoice.query.filter_by(user_id=user_id).all()
+            invoices = hide_deleted(Invoice.query.filter_by(user_id=user_id), Invoice).all()
             return [inv.to_dict() for inv in invoices], 200
         except Exception as e:
             logger.error(f"Error retrieving future invoices for user {user_id}: {e}")
@@ -408,16 +534,14 @@ api.add_resource(FutureInvoices, '/api/invoices/<int:user_id>/future')
 class UserCompanies(Resource):
     def get(self, user_id):
         try:
-            memos_companies = db.session.query(Memo.company).filter_by(user_id=user_id).distinct()
-            invoices_companies = db.session.query(Invoice.company).filter_by(user_id=user_id).distinct()
-
-            companies = set()
-            for row in memos_companies:
-                companies.add(row.company)
-            for row in invoices_companies:
-                companies.add(row.company)
-
-            return list(companies), 200
+            if user_id in hidden_user_ids():
+                return [], 200
+            company_ids = (
+                db.session.query(Memo.company_id).filter_by(user_id=user_id)
+                .union(db.session.query(Invoice.company_id).filter_by(user_id=user_id))
+            )
+            names = db.session.query(Company.name).filter(Company.id.in_(company_ids.subquery().select()))
+            return [row.name for row in names], 200
         except Exception as e:
             logger.error(f"Error retrieving companies for user {user_id}: {e}")
             return {'error': 'Failed to retrieve companies'}, 500
@@ -425,11 +549,84 @@ class UserCompanies(Resource):
 api.add_resource(UserCompanies, '/api/companies/<int:user_id>')
 
 
+class CompanySuggest(Resource):
+    def get(self):
+        try:
+            limit = min(request.args.get('limit', 10, type=int), 50)
+            # Served from the in-memory prefix index (see companies.py)
+            return [company._asdict() for company in companies.suggest(request.args.get('q', ''), limit)], 200
+        except Exception as e:
+            logger.error(f"Error suggesting companies: {e}")
+            return {'error': 'Failed to suggest companies'}, 500
+
+api.add_resource(CompanySuggest, '/api/companies/suggest')
+
+
+class Documents(Resource):
+    def get(self):
+        try:
+            since = request.args.get('since')
+            until = request.args.get('until')
+            filters = {
+                'user_id': request.args.get('user_id', type=int),
+                'company': request.args.get('company'),
+                'since': datetime.strptime(since, '%Y-%m-%d') if since else None,
+                # 'until' is inclusive, so filter on the start of the next day
+                'until': datetime.strptime(until, '%Y-%m-%d') + timedelta(days=1) if until else None,
+            }
+        except ValueError:
+            return {'error': 'Dates must be in YYYY-MM-DD format'}, 400
+
+        try:
+            limit = min(request.args.get('limit', 50, type=int), 200)
+            documents, next_cursor = documents_page(filters, request.args.get('cursor'), limit)
+            return {'documents': documents, 'next_cursor': next_cursor}, 200
+        except InvalidCursor:
+            logger.warning(f"Invalid timeline cursor: {request.args.get('cursor')!r}")
+            return {'error': 'invalid cursor'}, 400
+        except Exception as e:
+            logger.error(f"Error retrieving document timeline: {e}")
+            return {'error': 'Failed to retrieve documents'}, 500
+
+api.add_resource(Documents, '/api/documents')
+
+
+class Sync(Resource):
+    def get(self):
+        company = request.args.get('company')
+        if not company:
+            logger.error("Missing company parameter in sync request.")
+            return {'error': 'Company parameter is required'}, 400
+
+        try:
+            since = request.args.get('since', type=int)
+            if since is None:
+                # First sync: hand out the current cursor; the client then
+                # loads the full lists from /memos and /invoices.
+                return {'changes': [], 'cursor': latest_cursor(), 'has_more': False}, 200
+
+            limit = min(request.args.get('limit', current_app.config['SYNC_PAGE_SIZE'], type=int), 1000)
+            # Events carry the company's canonical spelling
+            found = companies.lookup(company)
+            company = found.name if found else company
+            changes, cursor, has_more = changes_since(company, since, limit)
+            logger.info(f"Sync for company {company}: {len(changes)} changes after {since}.")
+            return {'changes': changes, 'cursor': cursor, 'has_more': has_more}, 200
+        except CursorExpired:
+            logger.warning(f"Sync cursor {since} for company {company} has expired.")
+            return {'error': 'Sync cursor has expired, a full reload is required'}, 410
+        except Exception as e:
+            logger.error(f"Error during sync: {e}")
+            return {'error': 'Failed to sync'}, 500
+
+api.add_resource(Sync, '/api/sync')
+
+
 class Categories(Resource):
     def get(self):
         try:
             from models import Category
-            categories = Category.query.all()
+            categories = Category.query.filter_by(deleted_at=None).all()
             return [cat.to_dict() for cat in categories], 200
         except Exception as e:
             logger.error(f"Error retrieving categories: {e}")
@@ -438,26 +635,54 @@ class Categories(Resource):
 api.add_resource(Categories, '/api/categories')
 
 
+class ReadCacheMetrics(Resource):
+    def get(self):
+        metrics = {cache.name: cache.stats() for cache in (memo_reads, invoice_reads)}
+        metrics['entities'] = entities.stats()
+        metrics['group_commit'] = writer.stats()
+        return metrics, 200
+
+api.add_resource(ReadCacheMetrics, '/api/metrics/reads')
+
+
+class Batch(Resource):
+    def post(self):
+        try:
+            sub_requests = parse_requests((request.get_json(silent=True) or {}).get('requests'))
+        except ValueError as e:
+            logger.error(f"Invalid batch request: {e}")
+            return {'error': str(e)}, 400
+
+        try:
+            # Independent reads run concurrently (see batch.py)
+            responses = run_batch(sub_requests)
+            logger.info(f"Batch of {len(sub_requests)} sub-requests completed.")
+            return {'responses': responses}, 200
+        except Exception as e:
+            logger.error(f"Error running batch: {e}")
+            return {'error': 'Failed to run batch'}, 500
+
+api.add_resource(Batch, '/api/batch')
+
+
 # -----------------------------------------------------------------------
 # ADDED RESOURCE FOR INDIVIDUAL MEMO (GET, PATCH, DELETE)
 # -----------------------------------------------------------------------
+# Fields a PATCH may change; company is resolved separately
+MEMO_FIELDS = (
+    'title', 'memo_number', 'expiry_date', 'wholesaler_details', 'buyer_details', 'items', 'total_value', 'remarks',
+)
+
+
 class MemoByID(Resource):
     def get(self, memo_id):
         try:
-            memo = Memo.query.get_or_404(memo_id)
-            memo_dict = {
-                "id": memo.id,
-                "title": memo.title,
-                "memo_number": memo.memo_number,
-                "expiry_date": memo.expiry_date,
-                "wholesaler_details": memo.wholesaler_details,
-                "buyer_details": memo.buyer_details,
-                "items": memo.items,
-                "total_value": memo.total_value,
-                "remarks": memo.remarks,
-                "company": memo.company,
-                "user_id": memo.user_id,
-            }
+            memo_dict = entities.get(Memo, memo_id)
+            if memo_dict is None or memo_dict['user_id'] in hidden_user_ids():
+                archived = archived_memo(memo_id) if include_archived() else None
+                if archived:
+                    return archived, 200
+                return {'error': 'Memo not found'}, 404
             return memo_dict, 200
         except Exception as e:
             logger.error(f"Error retrieving memo {memo_id}: {e}")
@@ -473,36 +698,31 @@ class MemoByID(Resource):
                 return {'error': 'Unauthorized'}, 403
 
             data = request.json
-            memo.title = data.get('title', memo.title)
-            memo.memo_number = data.get('memo_number', memo.memo_number)
-            memo.expiry_date = data.get('expiry_date', memo.expiry_date)
-            memo.wholesaler_details = data.get('wholesaler_details', memo.wholesaler_details)
-            memo.buyer_details = data.get('buyer_details', memo.buyer_details)
-            memo.items = data.get('items', memo.items)
-            memo.total_value = data.get('total_value', memo.total_value)
-            memo.remarks = data.get('remarks', memo.remarks)
-            memo.company = data.get('company', memo.company)
-
-            db.session.commit()
+            changes = {field: data[field] for field in MEMO_FIELDS if field in data}
+            if changes.get('memo_number', memo.memo_number) != memo.memo_number:
+                check_client_number('memo', changes['memo_number'])
+            if 'company' in data:
+                company = companies.resolve(data['company'])
+                changes.update(company=company.name, company_id=company.id)
+
+            memo, old_company = run_write(update_document, 'memo', memo, changes)
+            memo_reads.invalidate(old_company, memo.company)
+            entities.put(memo)
+            invalidate_pdf('memo', memo_id)
             logger.info(f"Memo ID {memo_id} updated successfully.")
 
-            memo_dict = {
-                "id": memo.id,
-                "title": memo.title,
-                "memo_number": memo.memo_number,
-                "expiry_date": memo.expiry_date,
-                "wholesaler_details": memo.wholesaler_details,
-                "buyer_details": memo.buyer_details,
-                "items": memo.items,
-                "total_value": memo.total_value,
-                "remarks": memo.remarks,
-                "company": memo.company,
-                "user_id": memo.user_id,
-            }
+            memo_dict = memo.to_api_dict()
             return {
                 'message': 'Memo updated successfully',
                 'memo': memo_dict
             }, 200
+        except ValueError as e:
+            logger.warning(f"Invalid update for memo {memo_id}: {e}")
+            return {'error': str(e)}, 400
+        except StaleDataError:
+            return _update_conflict(Memo, 'Memo', memo_id)
+        except WriteTimeout:
+            return _write_timeout(f"memo {memo_id}")
         except Exception as e:
             logger.error(f"Error updating memo {memo_id}: {e}")
             return {'error': 'Failed to update memo'}, 500
@@ -516,8 +736,14 @@ class MemoByID(Resource):
             if memo.user_id != session['user_id']:
                 return {'error': 'Unauthorized'}, 403
 
+            company = memo.company
+            record_change('memo', 'deleted', memo)
+            Attachment.query.filter_by(memo_id=memo_id).delete(synchronize_session=False)
             db.session.delete(memo)
             db.session.commit()
+            memo_reads.invalidate(company)
+            entities.invalidate(Memo, memo_id)
+            invalidate_pdf('memo', memo_id)
             logger.info(f"Memo ID {memo_id} deleted successfully.")
             return {'message': 'Memo deleted successfully'}, 200
         except Exception as e:
@@ -527,8 +753,327 @@ class MemoByID(Resource):
 api.add_resource(MemoByID, '/api/memos/<int:memo_id>')
 
 
+class MemoBatch(Resource):
+    def get(self):
+        try:
+            ids = requested_ids()
+        except ValueError:
+            return {'error': 'ids must be a comma-separated list of up to 200 memo ids'}, 400
+
+        try:
+            # Cached memos are served from memory, the rest with one IN query
+            found = entities.get_many(Memo, ids)
+            hidden = hidden_user_ids()
+            return [found[i] for i in dict.fromkeys(ids) if i in found and found[i]['user_id'] not in hidden], 200
+        except Exception as e:
+            logger.error(f"Error retrieving memos {ids}: {e}")
+            return {'error': 'Failed to retrieve memos'}, 500
+
+api.add_resource(MemoBatch, '/api/memos')
+
+
+class MemoConvert(Resource):
+    def post(self):
+        if 'user_id' not in session:
+            logger.warning("Unauthorized memo conversion attempt.")
+            return {'error': 'User not authenticated'}, 401
+
+        data = request.json or {}
+        memo_ids = data.get('memo_ids')
+        filters = data.get('filter')
+        if not memo_ids and not filters:
+            return {'error': 'memo_ids or filter is required'}, 400
+        try:
+            memo_ids = [int(memo_id) for memo_id in memo_ids] if memo_ids else None
+        except (TypeError, ValueError):
+            return {'error': 'memo_ids must be a list of ids'}, 400
+
+        try:
+            converted = convert_memos(session['user_id'], memo_ids, filters, close=bool(data.get('close_memos')))
+            db.session.commit()
+        except (IntegrityError, ConversionConflict):
+            db.session.rollback()
+            logger.warning("Memo conversion conflicted with a concurrent write.")
+            return {'error': 'Some memos were converted or added concurrently, please retry'}, 409
+        except ValueError as e:
+            db.session.rollback()
+            logger.warning(f"Invalid memo conversion filter: {e}")
+            return {'error': str(e)}, 400
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error converting memos: {e}")
+            return {'error': 'Failed to convert memos'}, 500
+
+        converted_companies = {row['company'] for row in converted}
+        memo_reads.invalidate(*converted_companies)
+        invoice_reads.invalidate(*converted_companies)
+        if data.get('close_memos'):
+            for row in converted:
+                entities.invalidate(Memo, row['memo_id'])
+                invalidate_pdf('memo', row['memo_id'])
+        logger.info(f"Converted {len(converted)} memos into invoices.")
+        return {'converted': converted}, 201
+
+api.add_resource(MemoConvert, '/api/memos/convert')
+
+
+# -----------------------------------------------------------------------
+# PDF Rendering - rendered in the worker pool and cached on disk
+# -----------------------------------------------------------------------
+class MemoPDF(Resource):
+    def get(self, memo_id):
+        try:
+            memo = db.session.get(Memo, memo_id)
+            if memo is None or memo.user_id in hidden_user_ids():
+                return {'error': 'Memo not found'}, 404
+            path = render_pdf('memo', memo)
+            return send_file(path, mimetype='application/pdf',
+                             download_name=secure_filename(f"memo-{memo.memo_number}.pdf"))
+        except Exception as e:
+            logger.error(f"Error rendering PDF for memo {memo_id}: {e}")
+            return {'error': 'Failed to render memo'}, 500
+
+api.add_resource(MemoPDF, '/api/memos/<int:memo_id>/pdf')
+
+
+class InvoicePDF(Resource):
+    def get(self, invoice_id):
+        try:
+            invoice = db.session.get(Invoice, invoice_id)
+            if invoice is None or invoice.user_id in hidden_user_ids():
+                return {'error': 'Invoice not found'}, 404
+            path = render_pdf('invoice', invoice)
+            return send_file(path, mimetype='application/pdf',
+                             download_name=secure_filename(f"invoice-{invoice.invoice_number}.pdf"))
+        except Exception as e:
+            logger.error(f"Error rendering PDF for invoice {invoice_id}: {e}")
+            return {'error': 'Failed to render invoice'}, 500
+
+api.add_resource(InvoicePDF, '/api/invoices/<int:invoice_id>/pdf')
+
+
+class InvoicePDFBatch(Resource):
+    def get(self):
+        company = request.args.get('company')
+        month = request.args.get('month')  # YYYY-MM
+        if not company or not month:
+            return {'error': 'Company and month parameters are required'}, 400
+        try:
+            start = datetime.strptime(month, '%Y-%m')
+        except ValueError:
+            return {'error': 'Month must be in YYYY-MM format'}, 400
+        end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+        try:
+            found = companies.lookup(company)
+            invoices = (
+                hide_deleted(Invoice.query, Invoice)
+                .filter(Invoice.company_id == (found.id if found else None),
+                        Invoice.created_at >= start, Invoice.created_at < end)
+                .order_by(Invoice.id)
+                .all()
+            )
+            paths = render_pdfs('invoice', invoices)
+            archive = zip_pdfs(
+                (secure_filename(f"invoice-{inv.id}-{inv.invoice_number}.pdf"), path)
+                for inv, path in zip(invoices, paths)
+            )
+            logger.info(f"Rendered {len(invoices)} invoices for {company} ({month}).")
+            return send_file(archive, mimetype='application/zip',
+                             download_name=secure_filename(f"invoices-{company}-{month}.zip"))
+        except Exception as e:
+            logger.error(f"Error rendering invoices for {company} ({month}): {e}")
+            return {'error': 'Failed to render invoices'}, 500
+
+api.add_resource(InvoicePDFBatch, '/api/invoices/pdf')
+
+
+# -----------------------------------------------------------------------
+# Attachments (photos and certificates) for memos and invoices
+# -----------------------------------------------------------------------
+
+def _upload_attachment(document, **owner):
+    """
+    Stores the raw request body as an attachment of `document`. The file name
+    is taken from ?filename= and the type from the Content-Type header.
+    """
+    if 'user_id' not in session:
+        return {'error': 'User not authenticated'}, 401
+    if document.user_id != session['user_id']:
+        return {'error': 'Unauthorized'}, 403
+    if request.mimetype.startswith('multipart/'):
+        return {'error': 'Send the file itself as the request body'}, 415
+
+    filename = secure_filename(request.args.get('filename', '')) or 'attachment'
+    try:
+        attachment = save_attachment(
+            request.stream, filename, request.mimetype or 'application/octet-stream',
+            session['user_id'], **owner
+        )
+        logger.info(f"Attachment {attachment.id} ({attachment.size} bytes) uploaded.")
+        return attachment.to_api_dict(), 201
+    except AttachmentTooLarge:
+        return {'error': 'Attachment is too large'}, 413
+
+
+class MemoAttachments(Resource):
+    def get(self, memo_id):
+        try:
+            attachments = (
+                hide_deleted(Attachment.query.filter_by(memo_id=memo_id), Attachment).order_by(Attachment.id).all()
+            )
+            return [attachment.to_api_dict() for attachment in attachments], 200
+        except Exception as e:
+            logger.error(f"Error retrieving attachments for memo {memo_id}: {e}")
+            return {'error': 'Failed to retrieve attachments'}, 500
+
+    def post(self, memo_id):
+        try:
+            memo = db.session.get(Memo, memo_id)
+            if memo is None:
+                return {'error': 'Memo not found'}, 404
+            return _upload_attachment(memo, memo_id=memo_id)
+        except Exception as e:
+            logger.error(f"Error uploading attachment for memo {memo_id}: {e}")
+            return {'error': 'Failed to upload attachment'}, 500
+
+api.add_resource(MemoAttachments, '/api/memos/<int:memo_id>/attachments')
+
+
+class InvoiceAttachments(Resource):
+    def get(self, invoice_id):
+        try:
+            attachments = (
+                hide_deleted(Attachment.query.filter_by(invoice_id=invoice_id), Attachment).order_by(Attachment.id).all()
+            )
+            return [attachment.to_api_dict() for attachment in attachments], 200
+        except Exception as e:
+            logger.error(f"Error retrieving attachments for invoice {invoice_id}: {e}")
+            return {'error': 'Failed to retrieve attachments'}, 500
+
+    def post(self, invoice_id):
+        try:
+            invoice = db.session.get(Invoice, invoice_id)
+            if invoice is None:
+                return {'error': 'Invoice not found'}, 404
+            return _upload_attachment(invoice, invoice_id=invoice_id)
+        except Exception as e:
+            logger.error(f"Error uploading attachment for invoice {invoice_id}: {e}")
+            return {'error': 'Failed to upload attachment'}, 500
+
+api.add_resource(InvoiceAttachments, '/api/invoices/<int:invoice_id>/attachments')
+
+
+class AttachmentByID(Resource):
+    def get(self, attachment_id):
+        try:
+            attachment = db.session.get(Attachment, attachment_id)
+            if attachment is None or attachment.user_id in hidden_user_ids():
+                return {'error': 'Attachment not found'}, 404
+            # conditional=True answers Range and If-None-Match requests
+            return send_file(blob_path(attachment.sha256), mimetype=attachment.content_type,
+                             download_name=attachment.filename, conditional=True,
+                             etag=attachment.sha256, max_age=86400)
+        except Exception as e:
+            logger.error(f"Error downloading attachment {attachment_id}: {e}")
+            return {'error': 'Failed to download attachment'}, 500
+
+    def delete(self, attachment_id):
+        if 'user_id' not in session:
+            return {'error': 'User not authenticated'}, 401
+
+        try:
+            attachment = db.session.get(Attachment, attachment_id)
+            if attachment is None:
+                return {'error': 'Attachment not found'}, 404
+            if attachment.user_id != session['user_id']:
+                return {'error': 'Unauthorized'}, 403
+
+            # The stored file may be shared; `flask attachments-gc` removes it once unused
+            db.session.delete(attachment)
+            db.session.commit()
+            logger.info(f"Attachment {attachment_id} deleted successfully.")
+            return {'message': 'Attachment deleted successfully'}, 200
+        except Exception as e:
+            logger.error(f"Error deleting attachment {attachment_id}: {e}")
+            return {'error': 'Failed to delete attachment'}, 500
+
+api.add_resource(AttachmentByID, '/api/attachments/<int:attachment_id>')
+
+
+class AttachmentThumbnail(Resource):
+    def get(self, attachment_id):
+        try:
+            attachment = db.session.get(Attachment, attachment_id)
+            if attachment is None or attachment.user_id in hidden_user_ids():
+                return {'error': 'Attachment not found'}, 404
+            path = thumbnail_path(attachment.sha256)
+            if not os.path.exists(path):
+                return {'error': 'No thumbnail available'}, 404
+            return send_file(path, mimetype='image/jpeg', conditional=True,
+                             etag=f"thumb-{attachment.sha256}", max_age=86400)
+        except Exception as e:
+            logger.error(f"Error retrieving thumbnail for attachment {attachment_id}: {e}")
+            return {'error': 'Failed to retrieve thumbnail'}, 500
+
+api.add_resource(AttachmentThumbnail, '/api/attachments/<int:attachment_id>/thumbnail')
+
+
+# -----------------------------------------------------------------------
+# App Factory
+# -----------------------------------------------------------------------
+_apps = weakref.WeakSet()  # Every app built by create_app() in this process
+
+
+def _discard_connections():
+    # A forked worker must not share pooled connections with its parent
+    for app in list(_apps):
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+# Registered once: a callback per create_app() call would pile up, e.g. one per test
+os.register_at_fork(after_in_child=_discard_connections)
+
+
+def create_app(profile=None):
+    """
+    Builds the app for a config profile ('development', 'testing' or
+    'production'; defaults to APP_PROFILE). No database connection is opened
+    and no worker pool is started here, so the app can be preloaded in a
+    pre-forking server's master process.
+    """
+    app = Flask(__name__)
+    app.config.from_object('config')
+    app.config.from_object(PROFILES[profile or DEFAULT_PROFILE])
+    app.json.compact = app.config['JSON_COMPACT']
+
+    db.init_app(app)
+    bcrypt.init_app(app)
+    api.init_app(app)
+    CORS(app, supports_credentials=True)
+    limits.init_app(app)
+    attachments.init_app(app)
+    entity_cache.init_app(app)
+    query_budget.init_app(app)
+    app.register_blueprint(main)
+    app.cli.add_command(archive_command)
+    app.cli.add_command(prune_command)
+    app.cli.add_command(attachments_gc_command)
+    app.cli.add_command(purge_command)
+    app.cli.add_command(delete_category_command)
+
+    # Only `flask` CLI commands need Flask-Migrate (and Alembic)
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    _apps.add(app)
+    return app
+
+
 ### Start the Flask App
 if __name__ == '__main__':
-    app.run(port=5555, debug=True)
+    create_app().run(port=5555, debug=True)
 
 
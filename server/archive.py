@@ -0,0 +1,123 @@
+"""
+Archival tier for memos and invoices.
+
+Expired memos and invoices older than INVOICE_ARCHIVE_AFTER_DAYS are moved out
+of the live tables in batches, so the rows scanned by Memos.get/Invoices.get
+stay small. Each archived row keeps the document's to_api_dict() output as
+compressed JSON, which lets the endpoints read through to the archive with
+include_archived=true and return the same shape as live rows.
+
+Run the job with:  flask archive
+"""
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app, request
+from flask.cli import with_appcontext
+
+from config import db, logger
+from models import Memo, Invoice, ArchivedMemo, ArchivedInvoice
+from outbox import record_change
+from entity_cache import entities
+from purge import hide_deleted
+
+
+def unpack(payload):
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def include_archived():
+    return request.args.get('include_archived', 'false').lower() == 'true'
+
+
+def archived_documents(archive_model, company):
+    rows = hide_deleted(archive_model.query.filter_by(company=company), archive_model).order_by(archive_model.id).all()
+    return [unpack(row.payload) for row in rows]
+
+
+def archived_memo(memo_id):
+    row = ArchivedMemo.query.filter_by(memo_id=memo_id).first()
+    return unpack(row.payload) if row else None
+
+
+def archived_invoice(invoice_id):
+    row = ArchivedInvoice.query.filter_by(invoice_id=invoice_id).first()
+    return unpack(row.payload) if row else None
+
+
+def _move(query, model, entity, make_archive_row, batch_size):
+    """
+    Moves every row matched by `query` into the archive, one batch per
+    transaction, and returns how many rows and bytes were moved.
+    """
+    stats = {'rows': 0, 'bytes': 0, 'compressed_bytes': 0}
+    while True:
+        documents = query.order_by(model.id).limit(batch_size).all()
+        if not documents:
+            break
+
+        archive_rows = []
+        for document in documents:
+            raw = json.dumps(document.to_api_dict(), separators=(',', ':')).encode('utf-8')
+            row = make_archive_row(document)
+            row.payload = zlib.compress(raw)
+            archive_rows.append(row)
+            record_change(entity, 'archived', document)
+            stats['bytes'] += len(raw)
+            stats['compressed_bytes'] += len(row.payload)
+
+        ids = [document.id for document in documents]
+        db.session.add_all(archive_rows)
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        for document_id in ids:
+            entities.invalidate(model, document_id)
+        db.session.expunge_all()
+        stats['rows'] += len(ids)
+    return stats
+
+
+def archive_memos(today=None, batch_size=None):
+    # Expiry dates are stored as zero-padded YYYY-MM-DD (see models.iso_date),
+    # so the string comparison is a date comparison and can use the index.
+    today = (today or date.today()).isoformat()
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    return _move(
+        Memo.query.filter(Memo.expiry_date < today),
+        Memo,
+        'memo',
+        lambda memo: ArchivedMemo(memo_id=memo.id, company=memo.company, user_id=memo.user_id),
+        batch_size,
+    )
+
+
+def archive_invoices(older_than_days=None, batch_size=None):
+    if older_than_days is None:
+        older_than_days = current_app.config['INVOICE_ARCHIVE_AFTER_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    return _move(
+        Invoice.query.filter(Invoice.created_at < cutoff),
+        Invoice,
+        'invoice',
+        lambda invoice: ArchivedInvoice(invoice_id=invoice.id, company=invoice.company, user_id=invoice.user_id),
+        batch_size,
+    )
+
+
+@click.command('archive')
+@click.option('--batch-size', type=int, default=None, help='Rows moved per transaction.')
+@click.option('--invoice-days', type=int, default=None, help='Archive invoices older than this many days.')
+@with_appcontext
+def archive_command(batch_size, invoice_days):
+    """Move expired memos and old invoices into the archive tables."""
+    memos = archive_memos(batch_size=batch_size)
+    invoices = archive_invoices(older_than_days=invoice_days, batch_size=batch_size)
+    for label, stats in (('memos', memos), ('invoices', invoices)):
+        logger.info(
+            f"Archived {stats['rows']} {label}: {stats['bytes']} bytes "
+            f"({stats['compressed_bytes']} compressed)."
+        )
+        click.echo(f"{label}: {stats['rows']} rows, {stats['bytes']} bytes, {stats['compressed_bytes']} compressed bytes")
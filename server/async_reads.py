@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Async read server for the company list endpoints.
+
+Runs as an ASGI app next to the Flask app:
+
+    uvicorn async_reads:app --port 5557
+
+and serves the same GET /memos?company=, GET /invoices?company= and
+GET /api/companies/<user_id> as app.py, with the same response bodies. Queries
+go through an async SQLAlchemy engine (aiosqlite for SQLite, asyncpg for
+PostgreSQL), so a request waiting on the database holds a coroutine rather
+than a WSGI thread, and one worker serves as many concurrent reads as the
+connection pool allows. Put it behind the same proxy as the Flask app and route
+these GETs to it; writes stay on the Flask app.
+
+Models and to_api_dict() are shared with app.py. Each list is read with one
+query: the company is matched on its name_key and soft-deleted users are
+excluded in SQL, so this process keeps no caches that writes would have to
+invalidate.
+
+Compare it with the threaded server using bench_reads.py.
+"""
+import json
+from urllib.parse import parse_qs
+
+from sqlalchemy import select, union
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import create_app
+from archive import unpack
+from companies import company_key
+from config import db, logger
+from models import ArchivedInvoice, ArchivedMemo, Company, Invoice, Memo, User
+
+flask_app = create_app()
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+engine = None
+Session = None
+
+
+def async_database_url():
+    """ASYNC_DATABASE_URL, or the app's database URL with the matching async driver."""
+    if flask_app.config['ASYNC_DATABASE_URL']:
+        return make_url(flask_app.config['ASYNC_DATABASE_URL'])
+    with flask_app.app_context():
+        # Resolved by Flask-SQLAlchemy, so relative SQLite paths match app.py's
+        url = db.engine.url
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def _live(model):
+    """Leaves out documents of soft-deleted users (see purge.py)."""
+    return model.user_id.notin_(select(User.id).where(User.deleted_at.isnot(None)))
+
+
+async def company_documents(session, model, archive_model, company, with_archive):
+    key = company_key(company)
+    documents = await session.scalars(
+        select(model)
+        .join(Company, model.company_id == Company.id)
+        .where(Company.name_key == key, _live(model))
+    )
+    serialized = [document.to_api_dict() for document in documents]
+    if with_archive:
+        archived = await session.scalars(
+            select(archive_model.payload)
+            .join(Company, archive_model.company == Company.name)
+            .where(Company.name_key == key, _live(archive_model))
+            .order_by(archive_model.id)
+        )
+        serialized.extend(unpack(payload) for payload in archived)
+    return serialized
+
+
+async def user_companies(session, user_id):
+    company_ids = union(
+        select(Memo.company_id).where(Memo.user_id == user_id, _live(Memo)),
+        select(Invoice.company_id).where(Invoice.user_id == user_id, _live(Invoice)),
+    ).subquery()
+    names = await session.scalars(select(Company.name).where(Company.id.in_(select(company_ids))))
+    return list(names)
+
+
+async def route(method, path, params):
+    """Returns (status, body) for one request."""
+    if method != 'GET':
+        return 405, {'error': 'Method not allowed'}
+
+    with_archive = params.get('include_archived', ['false'])[0].lower() == 'true'
+    company = params.get('company', [None])[0]
+
+    if path in ('/memos', '/invoices'):
+        if not company:
+            logger.error(f"Missing company parameter in async {path} request.")
+            return 400, {'error': 'Company parameter is required'}
+        model, archive_model = (Memo, ArchivedMemo) if path == '/memos' else (Invoice, ArchivedInvoice)
+        async with Session() as session:
+            return 200, await company_documents(session, model, archive_model, company, with_archive)
+
+    prefix = '/api/companies/'
+    if path.startswith(prefix) and path[len(prefix):].isdigit():
+        async with Session() as session:
+            return 200, await user_companies(session, int(path[len(prefix):]))
+
+    return 404, {'error': 'Not found'}
+
+
+async def _send_json(send, status, body, origin):
+    payload = json.dumps(body).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode('latin-1'))]
+    if origin:
+        headers.append((b'access-control-allow-origin', origin))
+        headers.append((b'access-control-allow-credentials', b'true'))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def _lifespan(receive, send):
+    global engine, Session
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            url = async_database_url()
+            options = {'pool_size': flask_app.config['ASYNC_POOL_SIZE']}
+            if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+                options = {}  # A single shared in-memory connection; there is no pool to size
+            engine = create_async_engine(url, **options)
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            logger.info(f"Async reads using {url.render_as_string(hide_password=True)}")
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    origin = dict(scope['headers']).get(b'origin')
+    try:
+        status, body = await route(scope['method'], scope['path'], parse_qs(scope['query_string'].decode('latin-1')))
+    except Exception as e:
+        logger.error(f"Error in async read {scope['path']}: {e}")
+        status, body = 500, {'error': 'Failed to retrieve documents'}
+    await _send_json(send, status, body, origin)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host=flask_app.config['ASYNC_READS_HOST'], port=flask_app.config['ASYNC_READS_PORT'])
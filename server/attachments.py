@@ -0,0 +1,160 @@
+"""
+Content-addressed storage for memo and invoice attachments.
+
+Uploads are streamed from the request body to a temporary file in
+ATTACHMENT_CHUNK_SIZE pieces while their SHA-256 is computed, so a file is never
+held in memory. The finished file is then moved to <ATTACHMENT_DIR>/<ab>/<cd>/<sha256>;
+if that path already exists the same content has been uploaded before and the
+temporary copy is dropped, so a certificate attached to many memos is stored
+once.
+
+Thumbnails of images are rendered in the shared process pool after the upload
+has been answered, and are likewise stored once per digest. Blobs that no
+attachment references any more are removed by `flask attachments-gc`.
+"""
+import hashlib
+import importlib.util
+import os
+import tempfile
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from config import db, logger
+from models import Attachment
+from thumbnails import make_thumbnail
+from workers import get_process_pool
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+def _storage_dir(*parts):
+    path = os.path.join(current_app.config['ATTACHMENT_DIR'], *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def blob_path(sha256):
+    return os.path.join(current_app.config['ATTACHMENT_DIR'], sha256[:2], sha256[2:4], sha256)
+
+
+def thumbnail_path(sha256):
+    return os.path.join(current_app.config['ATTACHMENT_DIR'], 'thumbnails', f"{sha256}.jpg")
+
+
+def store_stream(stream):
+    """
+    Copies `stream` into the store and returns (sha256, size). Raises
+    AttachmentTooLarge once more than ATTACHMENT_MAX_BYTES have been read.
+    """
+    chunk_size = current_app.config['ATTACHMENT_CHUNK_SIZE']
+    max_bytes = current_app.config['ATTACHMENT_MAX_BYTES']
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=_storage_dir('tmp'))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AttachmentTooLarge()
+                digest.update(chunk)
+                f.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            # Refresh the mtime so garbage collection treats the blob as new
+            os.utime(path)
+        else:
+            _storage_dir(sha256[:2], sha256[2:4])
+            os.replace(tmp_path, path)
+        return sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_attachment(stream, filename, content_type, user_id, memo_id=None, invoice_id=None):
+    """Stores an upload and commits its Attachment row."""
+    sha256, size = store_stream(stream)
+    attachment = Attachment(
+        memo_id=memo_id,
+        invoice_id=invoice_id,
+        user_id=user_id,
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        sha256=sha256,
+    )
+    db.session.add(attachment)
+    db.session.commit()
+    schedule_thumbnail(attachment)
+    return attachment
+
+
+def schedule_thumbnail(attachment):
+    """Renders a thumbnail in the background if the attachment is an image without one."""
+    if not attachment.content_type.startswith('image/'):
+        return
+    thumbnail = thumbnail_path(attachment.sha256)
+    if os.path.exists(thumbnail):
+        return
+    _storage_dir('thumbnails')
+    future = get_process_pool().submit(
+        make_thumbnail, blob_path(attachment.sha256), thumbnail, current_app.config['THUMBNAIL_SIZE']
+    )
+    future.add_done_callback(_log_thumbnail_error)
+
+
+def init_app(app):
+    # Checked without importing Pillow, which only the worker processes need
+    if importlib.util.find_spec('PIL') is None:
+        logger.warning("Pillow is not installed, so image attachments get no thumbnails.")
+
+
+def _log_thumbnail_error(future):
+    if future.exception() is not None:
+        logger.error(f"Error rendering thumbnail: {future.exception()}")
+
+
+def collect_garbage(grace_seconds=3600):
+    """
+    Removes blobs, thumbnails and abandoned uploads that no attachment points
+    at. Files younger than `grace_seconds` are kept, since their attachment row
+    may not be committed yet.
+    """
+    root = current_app.config['ATTACHMENT_DIR']
+    if not os.path.isdir(root):
+        return 0
+    referenced = {sha256 for (sha256,) in db.session.query(Attachment.sha256).distinct()}
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            sha256 = name[:-len('.jpg')] if directory.endswith('thumbnails') else name
+            path = os.path.join(directory, name)
+            if sha256 not in referenced and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+@click.command('attachments-gc')
+@click.option('--grace', type=int, default=3600, help='Keep unreferenced files younger than this many seconds.')
+@with_appcontext
+def attachments_gc_command(grace):
+    """Delete stored attachment files that no attachment references."""
+    removed = collect_garbage(grace)
+    logger.info(f"Removed {removed} unreferenced attachment files.")
+    click.echo(f"attachments: {removed} files removed")
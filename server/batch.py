@@ -0,0 +1,113 @@
+"""
+Composite requests (POST /api/batch).
+
+The dashboard needs several independent reads right after login. Instead of
+one HTTP round trip each, the client posts them together:
+
+    {"requests": [{"id": "companies", "method": "GET", "path": "/api/companies/1"},
+                  {"id": "memos", "method": "GET", "path": "/memos?company=Acme"}]}
+
+and gets back {"responses": [{"id", "status", "body"}, ...]} in the same
+order. Every sub-request is dispatched through the app like a normal request
+(rate limits, query budgets and all) with the caller's session cookie, so it
+sees the same logged-in user. Consecutive GETs run concurrently on a shared
+thread pool, so the batch takes about as long as its slowest read; any other
+method runs alone, in order, after everything before it has finished.
+
+Session changes made by a sub-request (logging in or out) are not passed back.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, request
+from werkzeug.test import EnvironBuilder
+
+from config import logger
+
+METHODS = ('GET', 'POST', 'PATCH', 'DELETE')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=current_app.config['BATCH_WORKERS'], thread_name_prefix='batch')
+        return _pool
+
+
+def _forget_pool():
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pool)
+
+
+def parse_requests(items):
+    """Validates the "requests" list of a batch; raises ValueError if it is malformed."""
+    limit = current_app.config['BATCH_MAX_REQUESTS']
+    if not isinstance(items, list) or not 1 <= len(items) <= limit:
+        raise ValueError(f"requests must be a list of 1 to {limit} sub-requests")
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"sub-request {index} must be an object")
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in METHODS:
+            raise ValueError(f"sub-request {index} has unsupported method {method}")
+        if not isinstance(path, str) or not path.startswith('/') or path.split('?')[0] == request.path:
+            raise ValueError(f"sub-request {index} needs a path other than {request.path}")
+        parsed.append({'id': item.get('id', index), 'method': method, 'path': path, 'body': item.get('body')})
+    return parsed
+
+
+def _dispatch(app, sub_request, headers, environ_base):
+    builder = EnvironBuilder(
+        path=sub_request['path'],
+        method=sub_request['method'],
+        json=sub_request['body'],
+        headers=headers,
+        environ_base=environ_base,
+    )
+    try:
+        # A fresh app context, so the sub-request gets its own g and session
+        # rather than sharing the batch's (writes run on the caller's thread)
+        with app.app_context(), app.request_context(builder.get_environ()):
+            response = app.full_dispatch_request()
+    except Exception as e:
+        logger.error(f"Error in batched {sub_request['method']} {sub_request['path']}: {e}")
+        return {'id': sub_request['id'], 'status': 500, 'body': {'error': 'Sub-request failed'}}
+    finally:
+        builder.close()
+    try:
+        return {'id': sub_request['id'], 'status': response.status_code, 'body': response.get_json(silent=True)}
+    finally:
+        response.close()
+
+
+def run_batch(sub_requests):
+    """Runs the sub-requests of the current request and returns their responses in order."""
+    app = current_app._get_current_object()
+    headers = {'Cookie': request.headers.get('Cookie', '')}
+    environ_base = {'REMOTE_ADDR': request.remote_addr}
+
+    responses = []
+    reads = []
+    for sub_request in sub_requests + [None]:
+        if sub_request is not None and sub_request['method'] == 'GET':
+            reads.append(sub_request)
+            continue
+        # A write (or the end of the batch) waits for the reads queued before it
+        if reads:
+            futures = [_get_pool().submit(_dispatch, app, read, headers, environ_base) for read in reads]
+            responses.extend(future.result() for future in futures)
+            reads = []
+        if sub_request is not None:
+            responses.append(_dispatch(app, sub_request, headers, environ_base))
+    return responses
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the server.
+
+Runs `python -X importtime` in fresh interpreters that import app.py and call
+create_app(), then reports the median wall time and the slowest imports:
+
+    python bench_import.py [--runs 5] [--profile production] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SNIPPET = "from app import create_app; create_app({profile!r})"
+
+
+def run_once(profile):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SNIPPET.format(profile=profile)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        imports[name] = (int(self_us), int(cumulative_us))
+    return elapsed, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--profile', default='production')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    timings = []
+    imports = {}
+    for _ in range(args.runs):
+        elapsed, imports = run_once(args.profile)
+        timings.append(elapsed)
+
+    print(f"create_app({args.profile!r}) cold start over {args.runs} runs: "
+          f"median {statistics.median(timings) * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms")
+    print("\nSlowest imports (cumulative, last run):")
+    slowest = sorted(imports.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Read load test: the threaded Flask app against async_reads.py.
+
+Seeds a throwaway SQLite database, starts both servers on it, and sends the
+same GET /memos?company= load to each from one asyncio client holding
+--concurrency requests in flight:
+
+    python bench_reads.py [--concurrency 200] [--requests 4000] [--threads 8]
+
+The Flask app runs under gunicorn's threaded worker, the async app under
+uvicorn, one worker process each. Requests cycle through --companies
+companies. READ_CACHE_TTL is set to 0 so the Flask app does not answer from
+its response cache, but concurrent identical reads are still coalesced there.
+Pass --database-url (and --company-prefix) to run against an existing,
+already seeded database instead, e.g. PostgreSQL, where every query really
+waits on the network.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def seed(database_url, companies, documents):
+    """Creates the schema and `documents` memos spread over `companies` companies."""
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    from config import db
+    from models import Category, Company, Memo, User
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Bench')
+        db.session.add(category)
+        db.session.flush()
+        user = User(name='Bench', lastname='User', username='bench', password='x', category_id=category.id)
+        db.session.add(user)
+        db.session.flush()
+        ids = []
+        for n in range(companies):
+            company = Company(name=f"Bench {n}", name_key=f"bench {n}")
+            db.session.add(company)
+            db.session.flush()
+            ids.append((company.id, company.name))
+        db.session.execute(Memo.__table__.insert(), [
+            {
+                'title': f"Memo {i}", 'memo_number': f"BENCH-{i}", 'expiry_date': '2099-01-01',
+                'wholesaler_details': 'Wholesaler', 'buyer_details': 'Buyer', 'items': 'Items',
+                'total_value': 100.0, 'remarks': '', 'company': ids[i % companies][1],
+                'company_id': ids[i % companies][0], 'user_id': user.id,
+            }
+            for i in range(documents)
+        ])
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(command, port, env):
+    process = subprocess.Popen(command, cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{command[0]} did not start on port {port}")
+
+
+async def fetch(port, path):
+    """One GET over a fresh connection; returns the status code."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode('latin-1'))
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # Headers and body, up to the server closing the connection
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def load(port, paths, total, concurrency):
+    latencies = []
+    errors = 0
+    sent = 0
+
+    async def client():
+        nonlocal errors, sent
+        while sent < total:
+            path = paths[sent % len(paths)]
+            sent += 1
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, path)
+            except OSError:
+                status = None
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def report(name, elapsed, latencies, errors):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<24} {len(latencies) / elapsed:8.0f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms   errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--threads', type=int, default=8, help='Threads of the gunicorn worker.')
+    parser.add_argument('--companies', type=int, default=50)
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--database-url', help='Use this seeded database instead of a temporary SQLite one.')
+    parser.add_argument('--company-prefix', default='Bench ', help='Companies are named <prefix><n>.')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    database_url = args.database_url or f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    if not args.database_url:
+        seed(database_url, args.companies, args.documents)
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        READ_CACHE_TTL='0',
+        RATE_LIMIT_ENABLED='false',
+        MAX_IN_FLIGHT=str(args.concurrency * 2),
+    )
+    paths = [f"/memos?company={args.company_prefix}{n}".replace(' ', '%20') for n in range(args.companies)]
+    servers = {
+        f"gunicorn ({args.threads} threads)": lambda port: [
+            sys.executable, '-m', 'gunicorn', '--workers', '1', '--threads', str(args.threads),
+            '--bind', f"127.0.0.1:{port}", "app:create_app('production')",
+        ],
+        'uvicorn (async_reads)': lambda port: [
+            sys.executable, '-m', 'uvicorn', 'async_reads:app', '--workers', '1',
+            '--port', str(port), '--log-level', 'warning',
+        ],
+    }
+
+    print(f"{args.requests} requests, {args.concurrency} in flight, {args.companies} companies")
+    try:
+        for name, command in servers.items():
+            port = free_port()
+            process = start_server(command(port), port, env)
+            try:
+                asyncio.run(load(port, paths, min(args.concurrency, 50), args.concurrency))  # Warm up
+                report(name, *asyncio.run(load(port, paths, args.requests, args.concurrency)))
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
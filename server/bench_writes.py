@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Concurrent write benchmark: per-request commits against group commit.
+
+Starts the Flask app under gunicorn's threaded worker twice, on a fresh SQLite
+database each time, once as configured and once with GROUP_COMMIT_ENABLED, and
+sends the same burst of POST /memos from --concurrency clients:
+
+    python bench_writes.py [--concurrency 64] [--requests 2000] [--threads 64]
+
+Reports throughput, latency and failed requests (e.g. "database is locked")
+for both runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+
+from bench_reads import free_port, report, start_server
+from config import db
+from models import Category
+
+
+def seed(database_url):
+    engine = create_engine(database_url)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Category), {'name': 'Bench'})
+    engine.dispose()
+
+
+async def send(port, method, path, body=None, cookie=None):
+    """One request over a fresh connection; returns (status, headers, body)."""
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+    if payload:
+        head += f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+    if cookie:
+        head += f"Cookie: {cookie}\r\n"
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(head.encode('latin-1') + b"\r\n" + payload)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    header_block, _, body = response.partition(b"\r\n\r\n")
+    lines = header_block.decode('latin-1').split("\r\n")
+    headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+    return int(lines[0].split()[1]), headers, body
+
+
+async def sign_up(port):
+    status, headers, _ = await send(port, 'POST', '/signup', {
+        'username': 'bench', 'password': 'bench', 'name': 'Bench', 'lastname': 'User', 'category_id': 1,
+    })
+    if status != 201:
+        raise RuntimeError(f"signup failed with {status}")
+    return headers['Set-Cookie'].split(';', 1)[0]
+
+
+async def burst(port, cookie, total, concurrency, companies):
+    latencies = []
+    errors = 0
+    sent = 0
+
+    async def client():
+        nonlocal errors, sent
+        while sent < total:
+            n = sent
+            sent += 1
+            memo = {
+                'title': f"Memo {n}", 'expiry_date': '2099-01-01', 'wholesaler_details': 'Wholesaler',
+                'buyer_details': 'Buyer', 'items': 'Items', 'total_value': 100.0,
+                'company': f"Bench {n % companies}",
+            }
+            start = time.perf_counter()
+            try:
+                status, _, _ = await send(port, 'POST', '/memos', memo, cookie)
+            except OSError:
+                status = None
+            latencies.append(time.perf_counter() - start)
+            if status != 201:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=64, help='Threads of the gunicorn worker.')
+    parser.add_argument('--companies', type=int, default=10)
+    parser.add_argument('--window-ms', default='5', help='GROUP_COMMIT_WINDOW_MS for the group commit run.')
+    args = parser.parse_args()
+
+    runs = {
+        'per-request commit': {'GROUP_COMMIT_ENABLED': 'false'},
+        f"group commit ({args.window_ms} ms)": {'GROUP_COMMIT_ENABLED': 'true', 'GROUP_COMMIT_WINDOW_MS': args.window_ms},
+    }
+    print(f"{args.requests} POST /memos, {args.concurrency} in flight, {args.threads} server threads")
+    for name, settings in runs.items():
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+            seed(database_url)
+            env = dict(
+                os.environ,
+                DATABASE_URL=database_url,
+                RATE_LIMIT_ENABLED='false',
+                MAX_IN_FLIGHT=str(args.concurrency * 2),
+                **settings,
+            )
+            port = free_port()
+            process = start_server([
+                sys.executable, '-m', 'gunicorn', '--workers', '1', '--threads', str(args.threads),
+                '--bind', f"127.0.0.1:{port}", "app:create_app('production')",
+            ], port, env)
+            try:
+                cookie = asyncio.run(sign_up(port))
+                report(name, *asyncio.run(burst(port, cookie, args.requests, args.concurrency, args.companies)))
+            finally:
+                process.terminate()
+                process.wait()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+The companies table and an in-memory directory of it.
+
+Memos and invoices reference their company by company_id, so list filters and
+indexes compare integers. Their `company` column still holds the company's
+name, which the API, the outbox and the caches key on. Names are matched on a
+normalized key (case and runs of whitespace ignored), so "Acme  Inc" and
+"acme inc" are the same company and every document carries one spelling.
+
+Each worker keeps the whole directory in memory: a dict from key to company and
+a sorted list of keys that GET /api/companies/suggest?q= bisects for prefix
+matches, so typeahead never touches the database. The list is reloaded every
+COMPANY_INDEX_TTL seconds to pick up companies created by other workers; a
+lookup of a name this worker has not seen yet checks the table directly.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from config import db
+from models import Company
+
+CompanyEntry = namedtuple('CompanyEntry', ['id', 'name'])
+
+
+def company_key(name):
+    return ' '.join(name.split()).casefold()
+
+
+class CompanyDirectory:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expires_at = 0.0
+        self._index = ({}, [])  # ({key: CompanyEntry}, sorted keys)
+
+    def lookup(self, name):
+        """Returns the CompanyEntry for `name`, or None if there is no such company."""
+        key = company_key(name or '')
+        if not key:
+            return None
+        self._refresh()
+        entry = self._index[0].get(key)
+        if entry is None:
+            entry = self._load(key)
+        return entry
+
+    def resolve(self, name):
+        """Returns the CompanyEntry for `name`, creating the company if needed."""
+        key = company_key(name or '')
+        if not key:
+            raise ValueError('Company name is required')
+        entry = self.lookup(name)
+        if entry is not None:
+            return entry
+
+        companies = Company.__table__
+        # Committed on its own connection, like numbering.py's counters: a
+        # company that outlives a failed request is harmless.
+        with db.engine.begin() as conn:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(companies).values(name=' '.join(name.split()), name_key=key))
+            except IntegrityError:
+                pass  # Another worker created it first
+            row = conn.execute(select(companies.c.id, companies.c.name).where(companies.c.name_key == key)).one()
+        return self._remember(key, CompanyEntry(row.id, row.name))
+
+    def suggest(self, prefix, limit=10):
+        """Returns up to `limit` companies whose name starts with `prefix`, in name order."""
+        key = company_key(prefix or '')
+        if not key:
+            return []
+        self._refresh()
+        by_key, keys = self._index
+        start = bisect.bisect_left(keys, key)
+        matches = []
+        for candidate in keys[start:start + limit]:
+            if not candidate.startswith(key):
+                break
+            matches.append(by_key[candidate])
+        return matches
+
+    def reset(self):
+        """Forgets everything; the next call reloads the table."""
+        self._lock = threading.Lock()
+        self._expires_at = 0.0
+        self._index = ({}, [])
+
+    def _refresh(self):
+        if self._expires_at > time.monotonic():
+            return
+        with self._lock:
+            if self._expires_at > time.monotonic():
+                return
+            with db.engine.connect() as conn:
+                rows = conn.execute(select(Company.id, Company.name, Company.name_key)).all()
+            # Swapped in whole, so readers never see a half-built index
+            by_key = {row.name_key: CompanyEntry(row.id, row.name) for row in rows}
+            self._index = (by_key, sorted(by_key))
+            self._expires_at = time.monotonic() + current_app.config['COMPANY_INDEX_TTL']
+
+    def _load(self, key):
+        with db.engine.connect() as conn:
+            row = conn.execute(select(Company.id, Company.name).where(Company.name_key == key)).first()
+        if row is None:
+            return None
+        return self._remember(key, CompanyEntry(row.id, row.name))
+
+    def _remember(self, key, entry):
+        with self._lock:
+            by_key, keys = self._index
+            if key not in by_key:
+                by_key = {**by_key, key: entry}
+                keys = list(keys)
+                bisect.insort(keys, key)
+                self._index = (by_key, keys)
+        return entry
+
+
+companies = CompanyDirectory()
+os.register_at_fork(after_in_child=companies.reset)
@@ -1,19 +1,15 @@
 import os
+import sqlite3
 
-from sqlalchemy import MetaData
-from flask_cors import CORS
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import Engine
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_restful import Api, Resource
+from flask_restful import Api
 from flask_bcrypt import Bcrypt
-from flask_mail import Mail, Message
-from flask import Flask
 import logging  # Import logging library
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
-
+# Settings below are the defaults for every profile; the app itself is built by
+# create_app() in app.py.
 
 # Database configuration
 SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///app.db')  # Default to SQLite
@@ -36,36 +32,135 @@ MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', 'wxrq wejl ayln mmdc')  # Replac
 # JSON configuration
 JSON_COMPACT = False
 
+# Archive configuration
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+INVOICE_ARCHIVE_AFTER_DAYS = int(os.environ.get('INVOICE_ARCHIVE_AFTER_DAYS', 365))
+
+# PDF rendering configuration
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'pdf_cache'))
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 2))
+RENDER_TIMEOUT = int(os.environ.get('RENDER_TIMEOUT', 30))  # Seconds to wait for a worker
+
+# Memo/invoice attachments (see attachments.py)
+ATTACHMENT_DIR = os.environ.get('ATTACHMENT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'attachments'))
+ATTACHMENT_MAX_BYTES = int(os.environ.get('ATTACHMENT_MAX_BYTES', 50 * 1024 * 1024))
+ATTACHMENT_CHUNK_SIZE = 64 * 1024  # Bytes read from the request body at a time
+THUMBNAIL_SIZE = 256  # Longest side of image thumbnails, in pixels
+
+# Company list reads are coalesced and cached for this many seconds
+READ_CACHE_TTL = float(os.environ.get('READ_CACHE_TTL', 2))
+
+# Seconds between reloads of the in-memory company directory (see companies.py)
+COMPANY_INDEX_TTL = float(os.environ.get('COMPANY_INDEX_TTL', 60))
+
+# Single memo/invoice cache (see entity_cache.py)
+ENTITY_CACHE_SIZE = int(os.environ.get('ENTITY_CACHE_SIZE', 10000))  # Documents kept per worker
+ENTITY_CACHE_TTL = float(os.environ.get('ENTITY_CACHE_TTL', 10))
+ENTITY_CACHE_URL = os.environ.get('ENTITY_CACHE_URL')  # e.g. redis://localhost:6379/1
+ENTITY_CACHE_SHARED_TTL = int(os.environ.get('ENTITY_CACHE_SHARED_TTL', 3600))
+
+# Change stream (stream.py) configuration
+STREAM_HOST = os.environ.get('STREAM_HOST', '127.0.0.1')
+STREAM_PORT = int(os.environ.get('STREAM_PORT', 5556))
+STREAM_POLL_INTERVAL = float(os.environ.get('STREAM_POLL_INTERVAL', 1))  # Seconds between outbox polls
+STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', 15))
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 1000))  # Buffered events per client
+
+# Async read server (see async_reads.py)
+ASYNC_READS_HOST = os.environ.get('ASYNC_READS_HOST', '127.0.0.1')
+ASYNC_READS_PORT = int(os.environ.get('ASYNC_READS_PORT', 5557))
+ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')  # Defaults to the app's database with an async driver
+ASYNC_POOL_SIZE = int(os.environ.get('ASYNC_POOL_SIZE', 20))
+
+# Delta sync (see sync.py): change events and tombstones are kept this long
+SYNC_RETENTION_DAYS = int(os.environ.get('SYNC_RETENTION_DAYS', 30))
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', 10))  # Not on SQLite; longer than any write transaction
+
+# memo_number/invoice_number values reserved per worker at a time (see numbering.py)
+NUMBER_BLOCK_SIZE = int(os.environ.get('NUMBER_BLOCK_SIZE', 20))
+
+# Composite requests (see batch.py)
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))  # Sub-requests per POST /api/batch
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 8))              # Threads running batched reads
+
+# Group commit of memo/invoice writes (see group_commit.py). Experimental; leave it
+# off unless bench_writes.py shows a gain on the target machine.
+GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT_ENABLED', 'false').lower() == 'true'
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get('GROUP_COMMIT_WINDOW_MS', 5))  # Longest wait for more writes
+GROUP_COMMIT_MAX_OPS = int(os.environ.get('GROUP_COMMIT_MAX_OPS', 64))      # Writes per transaction
+GROUP_COMMIT_TIMEOUT = float(os.environ.get('GROUP_COMMIT_TIMEOUT', 10))    # Seconds a request waits for its commit
+
+# Admission control and rate limiting (see limits.py)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL')  # e.g. redis://localhost:6379/0
+MAX_IN_FLIGHT = int(os.environ.get('MAX_IN_FLIGHT', 64))
+RATE_LIMITS = {  # (requests, per_seconds), per client IP and per user
+    'default': (300, 60),
+    'login.post': (10, 60),
+    'signup.post': (5, 60),
+    'memos.post': (60, 60),
+    'invoices.post': (60, 60),
+}
+
+# Soft-deleted users and categories are removed by `flask purge` (see purge.py)
+PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 500))
+
+# Most SQL statements each write endpoint may issue, checked by tests/test_query_budgets.py (see query_budget.py)
+QUERY_BUDGETS = {
+    'signup.post': 2,          # category lookup, INSERT ... ON CONFLICT DO NOTHING RETURNING
+    'memos.post': 2,           # INSERT ... RETURNING, outbox INSERT
+    'invoices.post': 2,
+    'memobyid.patch': 3,       # SELECT, outbox INSERT, UPDATE
+    'invoicebyid.patch': 3,
+    'memobyid.delete': 4,      # SELECT, outbox INSERT, attachments DELETE, DELETE
+    'invoicebyid.delete': 4,
+    'memoattachments.post': 2,  # memo SELECT, INSERT ... RETURNING
+    'invoiceattachments.post': 2,
+}
+
 # Define metadata for SQLAlchemy
 metadata = MetaData(
     naming_convention={
+        "ix": "ix_%(column_0_label)s",
         "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
     }
 )
 
-# Apply configurations
-app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = SQLALCHEMY_TRACK_MODIFICATIONS
-app.config['SECRET_KEY'] = SECRET_KEY
-app.config['MAIL_SERVER'] = MAIL_SERVER
-app.config['MAIL_PORT'] = MAIL_PORT
-app.config['MAIL_USE_TLS'] = MAIL_USE_TLS
-app.config['MAIL_USERNAME'] = MAIL_USERNAME
-app.config['MAIL_PASSWORD'] = MAIL_PASSWORD
-app.json.compact = JSON_COMPACT
+# Profiles for create_app(profile); each overrides the module-level defaults above
+class DevelopmentConfig:
+    pass
 
 
-# Initialize extensions
-db = SQLAlchemy(metadata=metadata)
-db.init_app(app)
-migrate = Migrate(app, db)
-api = Api(app)
-bcrypt = Bcrypt(app)
-CORS(app)
+class TestingConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    RATE_LIMIT_ENABLED = False
+    ENTITY_CACHE_URL = 'local://'
 
 
-# Mail configuration
-mail = Mail(app)
+class ProductionConfig:
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True}
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
+DEFAULT_PROFILE = os.environ.get('APP_PROFILE', 'development')
+
 
+# Initialize extensions (bound to an app in create_app)
+# Mail is set up on first send (mailer.py) and Migrate only for CLI commands.
+# SQLite only honours ON DELETE CASCADE / SET NULL with foreign keys switched on
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
 
 
+# Objects stay loaded after commit, so building a response does not re-SELECT them.
+db = SQLAlchemy(metadata=metadata, session_options={'expire_on_commit': False})
+api = Api()
+bcrypt = Bcrypt()
@@ -0,0 +1,127 @@
+"""
+Set-based conversion of memos into invoices (POST /api/memos/convert).
+
+All selected memos are copied into invoices by a single INSERT ... SELECT, in
+the same transaction as the optional UPDATE that closes them and the outbox
+events for both. Each invoice records its source_memo_id, which is unique, so
+a memo is never converted twice: memos that already have an invoice are
+skipped, and a concurrent conversion of the same memo fails as a whole.
+
+Invoices get their numbers from the allocator (see numbering.py) like any
+other invoice. The INSERT writes a placeholder, INV-0-<memo id>: it is unique
+for the same reason source_memo_id is, counter ids start at 1 and clients
+cannot supply numbers of that form. One executemany UPDATE then sets the
+numbers, which are reserved up front from a count of the matching memos per
+company. If more memos match by the time of the INSERT, the conversion fails
+and can be retried.
+"""
+from datetime import datetime
+
+from sqlalchemy import String, bindparam, cast, false, func, insert, literal, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from companies import companies
+from config import db
+from models import Memo, Invoice, iso_date
+from numbering import allocator
+from outbox import record_changes
+
+INVOICE_COLUMNS = (
+    'title', 'invoice_number', 'wholesaler_details', 'buyer_details', 'items',
+    'total_value', 'company', 'company_id', 'user_id', 'created_at', 'source_memo_id',
+)
+
+
+def convertible_memos(user_id, memo_ids=None, filters=None):
+    """Builds the WHERE clause for the user's memos that have no invoice yet."""
+    conditions = [
+        Memo.user_id == user_id,
+        ~select(Invoice.id).where(Invoice.source_memo_id == Memo.id).exists(),
+    ]
+    if memo_ids is not None:
+        conditions.append(Memo.id.in_(memo_ids))
+    filters = filters or {}
+    if filters.get('company'):
+        company = companies.lookup(filters['company'])
+        conditions.append(Memo.company_id == company.id if company else false())
+    if filters.get('status'):
+        conditions.append(Memo.status == filters['status'])
+    if filters.get('expiry_before'):
+        conditions.append(Memo.expiry_date < iso_date(filters['expiry_before']))
+    return conditions
+
+
+class ConversionConflict(Exception):
+    pass
+
+
+def convert_memos(user_id, memo_ids=None, filters=None, close=False):
+    """
+    Creates one invoice per matching memo and returns a list of
+    {memo_id, invoice_id, invoice_number, company}. The caller commits.
+    Raises ConversionConflict if matching memos were added meanwhile.
+    """
+    conditions = convertible_memos(user_id, memo_ids, filters)
+    # Numbers are reserved before the INSERT: the allocator writes on its own
+    # connection, which would wait for this transaction's lock on SQLite.
+    counts = db.session.execute(select(Memo.company, func.count()).where(*conditions).group_by(Memo.company)).all()
+    numbers = {
+        company: [allocator.next_number('invoice', company) for _ in range(count)]
+        for company, count in counts
+    }
+    if not numbers:
+        return []
+
+    source = select(
+        Memo.title,
+        literal('INV-0-') + cast(Memo.id, String),
+        Memo.wholesaler_details,
+        Memo.buyer_details,
+        Memo.items,
+        Memo.total_value,
+        Memo.company,
+        Memo.company_id,
+        Memo.user_id,
+        literal(datetime.utcnow()),
+        Memo.id,
+    ).where(*conditions)
+    invoices = db.session.scalars(
+        insert(Invoice).from_select(INVOICE_COLUMNS, source).returning(Invoice)
+    ).all()
+    if not invoices:
+        return []
+    invoices.sort(key=lambda invoice: invoice.source_memo_id)
+
+    rows = []
+    for invoice in invoices:
+        if not numbers.get(invoice.company):
+            raise ConversionConflict()
+        rows.append({'invoice_id': invoice.id, 'number': numbers[invoice.company].pop(0)})
+    table = Invoice.__table__
+    db.session.execute(
+        update(table).where(table.c.id == bindparam('invoice_id')).values(invoice_number=bindparam('number')),
+        rows,
+    )
+    for invoice, row in zip(invoices, rows):
+        set_committed_value(invoice, 'invoice_number', row['number'])
+    record_changes('invoice', 'created', invoices)
+
+    if close:
+        memos = db.session.scalars(
+            update(Memo)
+            .where(Memo.id.in_([invoice.source_memo_id for invoice in invoices]))
+            .values(status='closed', version=Memo.version + 1)
+            .returning(Memo)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        ).all()
+        record_changes('memo', 'updated', memos)
+
+    return [
+        {
+            'memo_id': invoice.source_memo_id,
+            'invoice_id': invoice.id,
+            'invoice_number': invoice.invoice_number,
+            'company': invoice.company,
+        }
+        for invoice in invoices
+    ]
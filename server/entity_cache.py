@@ -0,0 +1,262 @@
+"""
+Read-through cache for single memos and invoices (MemoByID, InvoiceByID and
+the ?ids= multi-get).
+
+Entries are keyed by (table, id, version), where version is the row's
+version_id_col, so a cached document can never be mistaken for a newer one.
+There are two tiers:
+
+* an in-process LRU of ENTITY_CACHE_SIZE entries, kept for ENTITY_CACHE_TTL
+  seconds, which bounds how long another worker's write can go unseen when
+  there is no shared tier;
+* an optional shared tier (ENTITY_CACHE_URL, a Redis URL) holding a pointer
+  "entity:<table>:<id>" -> current version plus immutable entries
+  "entity:<table>:<id>:<version>". With it, a local hit only costs a pointer
+  lookup, and every worker sees a write immediately; a multi-get reads all
+  its pointers, and then all the entries it lacks, with one MGET each.
+  ENTITY_CACHE_URL = 'local://' uses the in-process LocalSharedTier instead
+  (the testing profile does), and any object with the same
+  get/get_many/set/add methods can be assigned to `entities.shared`.
+
+PATCH handlers write the new version through with put(); deletes and the
+archive job call invalidate(). A read that started before a write is not
+allowed to put its older copy back afterwards.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+from config import logger
+
+
+class LocalSharedTier:
+    """In-process stand-in for the shared tier, with the same interface as RedisSharedTier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}  # key -> (expires_at, value)
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            entries = [self._values.get(key) for key in keys]
+        return [entry[1] if entry is not None and entry[0] > now else None for entry in entries]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._values[key] = (time.monotonic() + ttl, value)
+
+    def add(self, key, value, ttl):
+        """Sets `key` only if it is not already set."""
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return False
+            self._values[key] = (time.monotonic() + ttl, value)
+            return True
+
+
+class RedisSharedTier:
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        return [value.decode('utf-8') if value is not None else None for value in self._client.mget(keys)]
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=ttl)
+
+    def add(self, key, value, ttl):
+        return bool(self._client.set(key, value, ex=ttl, nx=True))
+
+
+class EntityCache:
+    def __init__(self):
+        self.shared = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (table, id) -> (expires_at, version, data)
+        self._writes = 0               # bumped by put/invalidate to reject stale fills
+        self._hits = 0
+        self._misses = 0
+
+    def configure(self, url):
+        if not url:
+            return
+        if url == 'local://':
+            self.shared = LocalSharedTier()
+            return
+        try:
+            import redis
+            self.shared = RedisSharedTier(redis.Redis.from_url(url))
+        except ImportError:
+            logger.error("ENTITY_CACHE_URL is set but redis is not installed; using the in-process cache only.")
+
+    def get(self, model, document_id):
+        """Returns the to_api_dict() of one document, or None if it does not exist."""
+        return self.get_many(model, [document_id]).get(document_id)
+
+    def get_many(self, model, ids):
+        """
+        Returns {id: to_api_dict()} for the ids that exist, loading every miss
+        with a single IN query.
+        """
+        table = model.__tablename__
+        ids = list(dict.fromkeys(ids))
+        found = self._lookup(table, ids)
+        misses = [document_id for document_id in ids if document_id not in found]
+
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(misses)
+            writes = self._writes
+
+        if misses:
+            for document in model.query.filter(model.id.in_(misses)).all():
+                data = document.to_api_dict()
+                found[document.id] = data
+                self._fill(table, document.id, document.version, data, writes)
+        return found
+
+    def put(self, document):
+        """Writes the current version of `document` through after a commit."""
+        table = document.__tablename__
+        data = document.to_api_dict()
+        with self._lock:
+            self._writes += 1
+            self._store_local(table, document.id, document.version, data)
+        if self.shared is not None:
+            ttl = self._ttl()
+            self.shared.set(self._entry_key(table, document.id, document.version), json.dumps(data), ttl)
+            self.shared.set(self._pointer_key(table, document.id), str(document.version), ttl)
+
+    def invalidate(self, model, document_id):
+        table = model.__tablename__
+        with self._lock:
+            self._writes += 1
+            self._entries.pop((table, document_id), None)
+        if self.shared is not None:
+            # Version 0 never exists, so this tombstone keeps a slower reader
+            # from pointing other workers back at the deleted version.
+            self.shared.set(self._pointer_key(table, document_id), '0', self._ttl())
+
+    def clear(self):
+        """Drops this worker's entries; the shared tier is left alone."""
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'size': len(self._entries),
+                'hit_ratio': self._hits / total if total else 0.0,
+            }
+
+    def _lookup(self, table, ids):
+        """Returns {id: data} for the cached ones among `ids`."""
+        local = {}
+        now = time.monotonic()
+        with self._lock:
+            for document_id in ids:
+                key = (table, document_id)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    local[document_id] = entry
+
+        if self.shared is None:
+            return {document_id: entry[2] for document_id, entry in local.items()}
+
+        found = {}
+        wanted = {}  # id -> version missing from the local tier
+        pointers = self.shared.get_many([self._pointer_key(table, document_id) for document_id in ids])
+        for document_id, version in zip(ids, pointers):
+            if version is None or int(version) == 0:
+                continue
+            version = int(version)
+            entry = local.get(document_id)
+            if entry is not None and entry[1] == version:
+                found[document_id] = entry[2]
+            else:
+                wanted[document_id] = version
+        if not wanted:
+            return found
+
+        raws = self.shared.get_many([
+            self._entry_key(table, document_id, version) for document_id, version in wanted.items()
+        ])
+        loaded = {
+            document_id: json.loads(raw)
+            for document_id, raw in zip(wanted, raws)
+            if raw is not None
+        }
+        with self._lock:
+            for document_id, data in loaded.items():
+                self._store_local(table, document_id, wanted[document_id], data)
+        found.update(loaded)
+        return found
+
+    def _fill(self, table, document_id, version, data, writes):
+        with self._lock:
+            # A write or delete since the load started may have changed this
+            # row; leave it to the next read rather than caching what we read.
+            if self._writes != writes:
+                return
+            self._store_local(table, document_id, version, data)
+        if self.shared is not None:
+            ttl = self._ttl()
+            self.shared.set(self._entry_key(table, document_id, version), json.dumps(data), ttl)
+            # Only point at this version if no writer has set a pointer meanwhile
+            self.shared.add(self._pointer_key(table, document_id), str(version), ttl)
+
+    def _store_local(self, table, document_id, version, data):
+        key = (table, document_id)
+        self._entries[key] = (time.monotonic() + self._ttl(), version, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > current_app.config['ENTITY_CACHE_SIZE']:
+            self._entries.popitem(last=False)
+
+    def _ttl(self):
+        # With a shared tier every local hit is checked against the current
+        # version, so entries can live much longer.
+        if self.shared is not None:
+            return current_app.config['ENTITY_CACHE_SHARED_TTL']
+        return current_app.config['ENTITY_CACHE_TTL']
+
+    @staticmethod
+    def _pointer_key(table, document_id):
+        return f"entity:{table}:{document_id}"
+
+    @staticmethod
+    def _entry_key(table, document_id, version):
+        return f"entity:{table}:{document_id}:{version}"
+
+
+entities = EntityCache()
+
+
+def requested_ids(limit=200):
+    """Parses ?ids=1,2,3; raises ValueError if malformed or longer than `limit`."""
+    ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    if not ids or len(ids) > limit:
+        raise ValueError(f"ids must list between 1 and {limit} ids")
+    return ids
+
+
+def init_app(app):
+    entities.configure(app.config['ENTITY_CACHE_URL'])
@@ -0,0 +1,179 @@
+"""
+Optional group commit for memo and invoice writes. Experimental, and off by
+default.
+
+Normally every POST/PATCH commits its own transaction, which on SQLite means one
+fsync and one turn at the database write lock per request. With
+GROUP_COMMIT_ENABLED, request threads hand their write to a single writer
+thread instead. The writer takes whatever arrives within GROUP_COMMIT_WINDOW_MS
+of the first write, up to GROUP_COMMIT_MAX_OPS writes, runs each one in its own
+SAVEPOINT of one transaction and commits once. A write that fails is rolled
+back to its savepoint without affecting the others, and each request gets back
+its own result or exception. A request that gives up after
+GROUP_COMMIT_TIMEOUT cancels its write if the writer has not started it yet
+(WriteTimeout, a 503); otherwise it waits for the outcome, so a write the
+client was told failed is never committed later.
+
+Writes are plain functions that use db.session and return a result, e.g.
+insert_document(). run_write() runs them through the writer when it is enabled
+and commits them directly otherwise, so handlers have one code path. Anything
+that must not be repeated or that talks to other services (numbering,
+company lookups, cache invalidation, email) stays in the request thread.
+
+It has not shown a consistent gain. With bench_writes.py on a local disk,
+throughput ranged from no change to about a third higher and p99 latency
+dropped, but p50 latency often got worse, since every write now waits for the
+window and for the writes batched ahead of it. The saving is one fsync per
+write, so it can only pay off where commits are expensive (a slow disk,
+synchronous=FULL); measure on the target machine before turning it on.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from flask import current_app
+from sqlalchemy.pool import StaticPool
+
+from config import db, logger
+from outbox import record_change, record_update
+
+
+def insert_document(kind, document):
+    """Adds a new memo or invoice with its outbox event."""
+    db.session.add(document)
+    db.session.flush()
+    record_change(kind, 'created', document)
+    return document
+
+
+def update_document(kind, document, changes):
+    """
+    Applies `changes` to a memo or invoice loaded by the request, with its
+    outbox event. Returns (document, old_company). The document is merged
+    without reloading it, so its version still guards against a concurrent
+    update: if another request changed it first, the flush raises
+    StaleDataError, which run_write() passes on to the caller (a 409).
+    """
+    document = db.session.merge(document, load=False)
+    old_company = document.company
+    for name, value in changes.items():
+        setattr(document, name, value)
+    record_update(kind, document, old_company)
+    return document, old_company
+
+
+class WriteTimeout(Exception):
+    pass
+
+
+class GroupCommitWriter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._batches = 0
+        self._writes = 0
+
+    def submit(self, app, operation, args):
+        """Queues operation(*args) and returns a Future for its result."""
+        future = Future()
+        self._queue.put((operation, args, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(app,), name='group-commit', daemon=True)
+                self._thread.start()
+        return future
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'writes': self._writes,
+                'writes_per_batch': self._writes / self._batches if self._batches else 0.0,
+            }
+
+    def reset(self):
+        """The writer thread does not survive a fork; the child starts its own."""
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def _collect(self, window, max_ops):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + window
+        while len(batch) < max_ops:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, app):
+        with app.app_context():
+            window = app.config['GROUP_COMMIT_WINDOW_MS'] / 1000
+            max_ops = app.config['GROUP_COMMIT_MAX_OPS']
+            while True:
+                batch = self._collect(window, max_ops)
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    logger.error(f"Error committing a group of {len(batch)} writes: {e}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                finally:
+                    db.session.remove()
+
+    def _commit(self, batch):
+        results = []
+        for operation, args, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue  # Its request timed out and cancelled it
+            try:
+                with db.session.begin_nested():
+                    result = operation(*args)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            results.append((future, result))
+        db.session.commit()
+        for future, result in results:
+            future.set_result(result)
+        with self._lock:
+            self._batches += 1
+            self._writes += len(batch)
+
+
+writer = GroupCommitWriter()
+os.register_at_fork(after_in_child=writer.reset)
+
+
+def run_write(operation, *args):
+    """
+    Runs operation(*args) and commits it, through the group commit writer when
+    GROUP_COMMIT_ENABLED is set. Returns the operation's result or raises its
+    exception, or WriteTimeout if it was given up before it ran.
+    """
+    # In-memory SQLite gives every thread the same connection, so the writer
+    # could not keep a transaction of its own; commit in the request instead.
+    if not current_app.config['GROUP_COMMIT_ENABLED'] or isinstance(db.engine.pool, StaticPool):
+        try:
+            result = operation(*args)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return result
+    future = writer.submit(current_app._get_current_object(), operation, args)
+    try:
+        return future.result(timeout=current_app.config['GROUP_COMMIT_TIMEOUT'])
+    except FutureTimeout:
+        if future.cancel():
+            raise WriteTimeout()
+        # Already running: its batch commits or fails shortly
+        return future.result()
@@ -0,0 +1,13 @@
+# Production server settings:  gunicorn -c gunicorn.conf.py
+#
+# The app is built once in the master process (preload_app) and inherited by
+# each forked worker. create_app() opens no connections and starts no pools;
+# engines, render pools and number blocks are reset in every child after fork.
+import multiprocessing
+import os
+
+wsgi_app = "app:create_app('production')"
+bind = os.environ.get('BIND', '0.0.0.0:5555')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
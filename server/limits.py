@@ -0,0 +1,172 @@
+"""
+Admission control and per-user / per-IP rate limiting.
+
+Every request first passes global admission control: when more than
+MAX_IN_FLIGHT requests are already running in this process, or every database
+connection in the pool is checked out (so the request would only queue for
+one), it is rejected with 503 and a Retry-After header before doing any work.
+
+Admitted requests then take a token from two buckets, one keyed by client IP
+and one by the logged-in user. Limits are configured per resource in
+RATE_LIMITS as (requests, per_seconds), looked up by "<endpoint>.<method>",
+then "<endpoint>", then "default"; each of these limits has its own buckets,
+and "default" one per endpoint. An empty bucket gives 429 with Retry-After.
+
+Buckets live in process by default. Setting RATE_LIMIT_STORAGE_URL to a Redis
+URL shares them between workers; any object with the same take() method can
+be assigned to `limiter.backend`.
+"""
+import math
+import threading
+import time
+
+from flask import current_app, g, request, session
+
+from config import db, logger
+
+
+class LocalBackend:
+    """In-process token buckets, shared by the threads of one worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated_at)
+
+    def take(self, key, rate, capacity):
+        """
+        Takes one token from the bucket at `key`. Returns 0 when allowed,
+        otherwise the number of seconds until a token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+
+class RedisBackend:
+    """Token buckets stored in Redis so every worker process shares them."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[2])
+    local rate = tonumber(ARGV[1])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, client):
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key, rate, capacity):
+        return float(self._script(keys=[f"ratelimit:{key}"], args=[rate, capacity, time.time()]))
+
+
+class Limiter:
+    def __init__(self):
+        self.backend = LocalBackend()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def configure(self, storage_url):
+        if not storage_url:
+            return
+        try:
+            import redis
+            self.backend = RedisBackend(redis.Redis.from_url(storage_url))
+        except ImportError:
+            logger.error("RATE_LIMIT_STORAGE_URL is set but redis is not installed; using in-process limits.")
+
+    def enter(self):
+        with self._lock:
+            if self._in_flight >= current_app.config['MAX_IN_FLIGHT']:
+                return False
+            self._in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def limit_for(self, endpoint, method):
+        """Returns (name, (requests, per_seconds)) of the limit that applies, or None."""
+        limits = current_app.config['RATE_LIMITS']
+        for name in (f"{endpoint}.{method.lower()}", endpoint, 'default'):
+            if name in limits:
+                return name, limits[name]
+        return None
+
+    def retry_after(self, endpoint, method, ip, user_id):
+        match = self.limit_for(endpoint, method)
+        if match is None:
+            return 0
+        name, (requests, per_seconds) = match
+        rate = requests / per_seconds
+        # One bucket per limit, so a strict "memos.post" does not drain GET /memos
+        if name == 'default':
+            name = f"{endpoint}.default"
+        keys = [f"ip:{ip}:{name}"]
+        if user_id:
+            keys.append(f"user:{user_id}:{name}")
+        return max(self.backend.take(key, rate, requests) for key in keys)
+
+
+limiter = Limiter()
+
+
+def _pool_exhausted():
+    pool = db.engine.pool
+    max_overflow = getattr(pool, '_max_overflow', -1)
+    if max_overflow < 0 or not hasattr(pool, 'checkedout'):
+        return False  # Pool without a hard limit
+    return pool.checkedout() >= pool.size() + max_overflow
+
+
+def _reject(status, message, retry_after):
+    return {'error': message}, status, {'Retry-After': str(max(1, math.ceil(retry_after)))}
+
+
+def admit_request():
+    if not current_app.config['RATE_LIMIT_ENABLED'] or request.method == 'OPTIONS':
+        return None
+
+    if not limiter.enter():
+        logger.warning("Request rejected: too many requests in flight.")
+        return _reject(503, 'Server is busy, please retry', 1)
+    g.admitted = True
+
+    if _pool_exhausted():
+        logger.warning("Request rejected: database connection pool exhausted.")
+        return _reject(503, 'Server is busy, please retry', 1)
+
+    retry_after = limiter.retry_after(request.endpoint, request.method, request.remote_addr, session.get('user_id'))
+    if retry_after:
+        logger.warning(f"Rate limit exceeded for {request.endpoint} from {request.remote_addr}.")
+        return _reject(429, 'Too many requests', retry_after)
+    return None
+
+
+def release_request(exc=None):
+    if g.pop('admitted', False):
+        limiter.leave()
+
+
+def init_app(app):
+    limiter.configure(app.config['RATE_LIMIT_STORAGE_URL'])
+    app.before_request(admit_request)
+    app.teardown_request(release_request)
@@ -0,0 +1,21 @@
+"""
+Outgoing email.
+
+Flask-Mail is imported and attached to the app on the first send, so starting
+a worker or running a CLI command does not pay for it.
+"""
+from flask import current_app
+
+
+def send_email(subject, recipients, body):
+    from flask_mail import Mail, Message
+
+    if 'mail' not in current_app.extensions:
+        Mail(current_app)
+    message = Message(
+        subject=subject,
+        sender=current_app.config['MAIL_USERNAME'],
+        recipients=recipients,
+    )
+    message.body = body
+    current_app.extensions['mail'].send(message)
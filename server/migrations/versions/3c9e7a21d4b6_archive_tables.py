@@ -0,0 +1,80 @@
+"""archive tables
+
+Revision ID: 3c9e7a21d4b6
+Revises: 05ef1defb43d
+Create Date: 2026-10-19 11:40:02.118334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e7a21d4b6'
+down_revision = '05ef1defb43d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_memos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('memo_id', sa.Integer(), nullable=False),
+    sa.Column('company', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('memo_id')
+    )
+    with op.batch_alter_table('archived_memos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_memos_company'), ['company'], unique=False)
+        batch_op.create_index(batch_op.f('ix_archived_memos_user_id'), ['user_id'], unique=False)
+
+    op.create_table('archived_invoices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('company', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('invoice_id')
+    )
+    with op.batch_alter_table('archived_invoices', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_invoices_company'), ['company'], unique=False)
+        batch_op.create_index(batch_op.f('ix_archived_invoices_user_id'), ['user_id'], unique=False)
+
+    # SQLite cannot add a column with a non-constant default, so existing rows
+    # are backfilled explicitly and new rows get the model-side default.
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_memos_expiry_date'), ['expiry_date'], unique=False)
+
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_invoices_created_at'), ['created_at'], unique=False)
+
+    op.execute("UPDATE memos SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute("UPDATE invoices SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_invoices_created_at'))
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_memos_expiry_date'))
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('archived_invoices', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_invoices_user_id'))
+        batch_op.drop_index(batch_op.f('ix_archived_invoices_company'))
+
+    op.drop_table('archived_invoices')
+    with op.batch_alter_table('archived_memos', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_memos_user_id'))
+        batch_op.drop_index(batch_op.f('ix_archived_memos_company'))
+
+    op.drop_table('archived_memos')
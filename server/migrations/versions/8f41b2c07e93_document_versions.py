@@ -0,0 +1,32 @@
+"""document versions
+
+Revision ID: 8f41b2c07e93
+Revises: 3c9e7a21d4b6
+Create Date: 2026-10-19 12:22:47.530911
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f41b2c07e93'
+down_revision = '3c9e7a21d4b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,38 @@
+"""change events
+
+Revision ID: a7d3e5f19c28
+Revises: 8f41b2c07e93
+Create Date: 2026-10-19 13:05:11.904217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e5f19c28'
+down_revision = '8f41b2c07e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company', sa.String(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('change_events', schema=None) as batch_op:
+        batch_op.create_index('ix_change_events_company_id', ['company', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('change_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_events_company_id')
+
+    op.drop_table('change_events')
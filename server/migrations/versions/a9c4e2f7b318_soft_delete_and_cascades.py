@@ -0,0 +1,58 @@
+"""soft delete and cascades
+
+Revision ID: a9c4e2f7b318
+Revises: f1a7c3e9b205
+Create Date: 2026-10-19 16:20:33.842190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e2f7b318'
+down_revision = 'f1a7c3e9b205'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.drop_constraint('fk_users_category_id_categories', type_='foreignkey')
+        batch_op.create_foreign_key('fk_users_category_id_categories', 'categories', ['category_id'], ['id'], ondelete='CASCADE')
+
+    for table in ('memos', 'invoices'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_user_id_users', type_='foreignkey')
+            batch_op.create_foreign_key(f'fk_{table}_user_id_users', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_attachments_memo_id_memos', type_='foreignkey')
+        batch_op.drop_constraint('fk_attachments_invoice_id_invoices', type_='foreignkey')
+        batch_op.drop_constraint('fk_attachments_user_id_users', type_='foreignkey')
+        batch_op.create_foreign_key('fk_attachments_user_id_users', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_attachments_user_id_users', type_='foreignkey')
+        batch_op.create_foreign_key('fk_attachments_user_id_users', 'users', ['user_id'], ['id'])
+        batch_op.create_foreign_key('fk_attachments_invoice_id_invoices', 'invoices', ['invoice_id'], ['id'])
+        batch_op.create_foreign_key('fk_attachments_memo_id_memos', 'memos', ['memo_id'], ['id'])
+
+    for table in ('invoices', 'memos'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_user_id_users', type_='foreignkey')
+            batch_op.create_foreign_key(f'fk_{table}_user_id_users', 'users', ['user_id'], ['id'])
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_users_category_id_categories', type_='foreignkey')
+        batch_op.create_foreign_key('fk_users_category_id_categories', 'categories', ['category_id'], ['id'])
+        batch_op.drop_column('deleted_at')
+
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,147 @@
+"""companies
+
+Revision ID: b3d7f1e5a824
+Revises: a9c4e2f7b318
+Create Date: 2026-10-19 17:05:48.216734
+
+"""
+import json
+from collections import Counter, defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d7f1e5a824'
+down_revision = 'a9c4e2f7b318'
+branch_labels = None
+depends_on = None
+
+# The tables whose names make up the companies. change_events stores the name
+# too and is rewritten to match, but a name found only there belongs to
+# documents that were deleted and does not create a company.
+NAMED_TABLES = ('memos', 'invoices', 'archived_memos', 'archived_invoices', 'document_counters')
+
+
+def _key(name):
+    # Same normalization as companies.company_key()
+    return ' '.join(name.split()).casefold()
+
+
+def _deduplicate_companies(bind):
+    """
+    Creates one company per normalized name and rewrites every stored variant
+    to its most common spelling, so that "Acme  Inc" and "acme inc" become one
+    company. Document counters of merged variants are merged too, and change
+    events are renamed along with their documents.
+    """
+    companies = sa.table('companies', sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('name_key', sa.String))
+
+    spellings = defaultdict(Counter)  # key -> {stored name: rows}
+    for table_name in NAMED_TABLES:
+        table = sa.table(table_name, sa.column('company', sa.String))
+        rows = bind.execute(sa.select(table.c.company, sa.func.count()).group_by(table.c.company))
+        for name, count in rows:
+            spellings[_key(name)][name] += count
+
+    events = sa.table('change_events', sa.column('company', sa.String))
+    event_names = defaultdict(list)  # key -> [stored name]
+    for name in bind.execute(sa.select(events.c.company).distinct()).scalars():
+        event_names[_key(name)].append(name)
+
+    for key, names in sorted(spellings.items()):
+        # Most rows first, then alphabetical, so the choice is deterministic
+        canonical = ' '.join(sorted(names.items(), key=lambda item: (-item[1], item[0]))[0][0].split())
+        bind.execute(sa.insert(companies).values(name=canonical, name_key=key))
+        company_id = bind.execute(sa.select(companies.c.id).where(companies.c.name_key == key)).scalar_one()
+
+        for table_name in ('memos', 'invoices'):
+            table = sa.table(table_name, sa.column('company', sa.String), sa.column('company_id', sa.Integer))
+            bind.execute(
+                sa.update(table).where(table.c.company.in_(list(names))).values(company=canonical, company_id=company_id)
+            )
+        for table_name in ('archived_memos', 'archived_invoices'):
+            table = sa.table(table_name, sa.column('company', sa.String))
+            bind.execute(sa.update(table).where(table.c.company.in_(list(names))).values(company=canonical))
+        _merge_counters(bind, names, canonical)
+        _rename_events(bind, [name for name in event_names[key] if name != canonical], canonical)
+
+
+def _merge_counters(bind, names, canonical):
+    # Numbers embed the counter id, so keeping the oldest counter of each kind
+    # at the highest next_value of the group cannot reissue a number.
+    counters = sa.table(
+        'document_counters', sa.column('id', sa.Integer), sa.column('company', sa.String),
+        sa.column('kind', sa.String), sa.column('next_value', sa.Integer),
+    )
+    rows = bind.execute(
+        sa.select(counters.c.id, counters.c.kind, counters.c.next_value)
+        .where(counters.c.company.in_(list(names)))
+        .order_by(counters.c.id)
+    ).all()
+    kept = {}
+    for row in rows:
+        if row.kind not in kept:
+            kept[row.kind] = [row.id, row.next_value]
+            continue
+        kept[row.kind][1] = max(kept[row.kind][1], row.next_value)
+        bind.execute(sa.delete(counters).where(counters.c.id == row.id))
+    for counter_id, next_value in kept.values():
+        bind.execute(
+            sa.update(counters).where(counters.c.id == counter_id).values(company=canonical, next_value=next_value)
+        )
+
+
+def _rename_events(bind, names, canonical):
+    # Events, and the documents in their payloads, carry the name the stream
+    # and sync endpoints match on; rewriting them keeps older events visible
+    # under the merged spelling.
+    events = sa.table(
+        'change_events', sa.column('id', sa.Integer), sa.column('company', sa.String), sa.column('payload', sa.Text),
+    )
+    if not names:
+        return
+    rows = bind.execute(sa.select(events.c.id, events.c.payload).where(events.c.company.in_(names))).all()
+    for event_id, payload in rows:
+        values = {'company': canonical}
+        if payload:
+            document = json.loads(payload)
+            document['company'] = canonical
+            values['payload'] = json.dumps(document)
+        bind.execute(sa.update(events).where(events.c.id == event_id).values(**values))
+
+
+def upgrade():
+    op.create_table('companies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('name_key', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name_key', name='uq_companies_name_key')
+    )
+
+    for table in ('memos', 'invoices'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('company_id', sa.Integer(), nullable=True))
+
+    _deduplicate_companies(op.get_bind())
+
+    for table in ('memos', 'invoices'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('company_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_{table}_company_id_companies', 'companies', ['company_id'], ['id'])
+            batch_op.drop_index(f'ix_{table}_company_created_at')
+            batch_op.create_index(f'ix_{table}_company_id_created_at', ['company_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    # Merged spellings are not split up again
+    for table in ('invoices', 'memos'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_company_id_created_at')
+            batch_op.create_index(f'ix_{table}_company_created_at', ['company', 'created_at'], unique=False)
+            batch_op.drop_constraint(f'fk_{table}_company_id_companies', type_='foreignkey')
+            batch_op.drop_column('company_id')
+
+    op.drop_table('companies')
@@ -0,0 +1,31 @@
+"""document counters
+
+Revision ID: c2b8f4d6a011
+Revises: a7d3e5f19c28
+Create Date: 2026-10-19 13:48:36.271590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2b8f4d6a011'
+down_revision = 'a7d3e5f19c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('next_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company', 'kind', name='uq_document_counters_company_kind')
+    )
+
+
+def downgrade():
+    op.drop_table('document_counters')
@@ -0,0 +1,40 @@
+"""normalize expiry dates
+
+Revision ID: c7e5b2a9d416
+Revises: b3d7f1e5a824
+Create Date: 2026-10-19 18:12:40.517203
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e5b2a9d416'
+down_revision = 'b3d7f1e5a824'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Expiry dates are compared as strings by `flask archive`, which only
+    # orders them by date when they are zero-padded YYYY-MM-DD. New writes are
+    # normalized by Memo.validate_expiry_date; this rewrites older rows such as
+    # "2025-3-7". Values that are not dates at all are left for review.
+    bind = op.get_bind()
+    memos = sa.table('memos', sa.column('expiry_date', sa.String))
+    for (value,) in bind.execute(sa.select(memos.c.expiry_date).distinct()).all():
+        try:
+            normalized = datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+        except ValueError:
+            print(f"memos.expiry_date {value!r} is not a YYYY-MM-DD date; left unchanged")
+            continue
+        if normalized != value:
+            bind.execute(sa.update(memos).where(memos.c.expiry_date == value).values(expiry_date=normalized))
+
+
+def downgrade():
+    # The original spellings are not kept; normalized dates are valid either way
+    pass
@@ -0,0 +1,41 @@
+"""timeline indexes
+
+Revision ID: d4e1a9b3c572
+Revises: c2b8f4d6a011
+Create Date: 2026-10-19 14:31:09.660184
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e1a9b3c572'
+down_revision = 'c2b8f4d6a011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows backfilled with CURRENT_TIMESTAMP on SQLite lack the microseconds
+    # SQLAlchemy writes, which breaks string comparison against keyset cursors.
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in ('memos', 'invoices'):
+            op.execute(f"UPDATE {table} SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.create_index('ix_memos_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_memos_company_created_at', ['company', 'created_at'], unique=False)
+
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.create_index('ix_invoices_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_invoices_company_created_at', ['company', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_index('ix_invoices_company_created_at')
+        batch_op.drop_index('ix_invoices_user_id_created_at')
+
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_index('ix_memos_company_created_at')
+        batch_op.drop_index('ix_memos_user_id_created_at')
@@ -0,0 +1,47 @@
+"""attachments
+
+Revision ID: e6f2c8a4d913
+Revises: d4e1a9b3c572
+Create Date: 2026-10-19 15:02:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f2c8a4d913'
+down_revision = 'd4e1a9b3c572'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attachments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('memo_id', sa.Integer(), nullable=True),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], name='fk_attachments_invoice_id_invoices'),
+    sa.ForeignKeyConstraint(['memo_id'], ['memos.id'], name='fk_attachments_memo_id_memos'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_attachments_user_id_users'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.create_index('ix_attachments_invoice_id', ['invoice_id'], unique=False)
+        batch_op.create_index('ix_attachments_memo_id', ['memo_id'], unique=False)
+        batch_op.create_index('ix_attachments_sha256', ['sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.drop_index('ix_attachments_sha256')
+        batch_op.drop_index('ix_attachments_memo_id')
+        batch_op.drop_index('ix_attachments_invoice_id')
+
+    op.drop_table('attachments')
@@ -0,0 +1,36 @@
+"""memo conversion
+
+Revision ID: f1a7c3e9b205
+Revises: e6f2c8a4d913
+Create Date: 2026-10-19 15:41:12.503877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a7c3e9b205'
+down_revision = 'e6f2c8a4d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(), server_default='open', nullable=False))
+
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source_memo_id', sa.Integer(), nullable=True))
+        batch_op.create_unique_constraint('uq_invoices_source_memo_id', ['source_memo_id'])
+        batch_op.create_foreign_key('fk_invoices_source_memo_id_memos', 'memos', ['source_memo_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_invoices_source_memo_id_memos', type_='foreignkey')
+        batch_op.drop_constraint('uq_invoices_source_memo_id', type_='unique')
+        batch_op.drop_column('source_memo_id')
+
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_column('status')
@@ -1,3 +1,6 @@
+import json
+from datetime import datetime
+
 from sqlalchemy.orm import validates
 from sqlalchemy_serializer import SerializerMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -9,9 +12,33 @@ class Category(db.Model, SerializerMixin):
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, unique=True, nullable=False)
+    deleted_at = db.Column(db.DateTime)  # Soft delete; purge.py removes the row later
 
-    # Relationship with User
-    users = db.relationship('User', backref='category_obj', lazy=True, cascade="all, delete-orphan")
+    # Relationship with User; the database cascades deletes (passive_deletes)
+    users = db.relationship('User', backref='category_obj', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+        }
+
+
+# Company Model
+# One row per company; memos and invoices point at it by company_id. name_key
+# is the name lowercased with whitespace collapsed (see companies.py), so
+# spelling variants map to the same company.
+#
+# Documents keep their `company` name next to company_id: the API, the outbox,
+# the archive tables and the number counters are all keyed by name. It is
+# always copied from Company.name when a document is written, and companies
+# are never renamed, so the two cannot disagree.
+class Company(db.Model):
+    __tablename__ = 'companies'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    name_key = db.Column(db.String, unique=True, nullable=False)
 
     def to_dict(self):
         return {
@@ -29,11 +56,13 @@ class User(db.Model, SerializerMixin):
     lastname = db.Column(db.String, nullable=False)
     username = db.Column(db.String, unique=True, nullable=False)
     password = db.Column(db.String, nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), nullable=False)
+    deleted_at = db.Column(db.DateTime)  # Soft delete; purge.py removes the row later
 
-    # Relationships
-    memos = db.relationship('Memo', backref='user', lazy=True, cascade="all, delete-orphan")
-    invoices = db.relationship('Invoice', backref='user', lazy=True, cascade="all, delete-orphan")
+    # Relationships; the database cascades deletes, so deleting a user does not
+    # load its memos and invoices (passive_deletes)
+    memos = db.relationship('Memo', backref='user', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    invoices = db.relationship('Invoice', backref='user', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     serialize_rules = ('-memos.user', '-invoices.user')  # Avoid circular references
 
@@ -80,6 +109,18 @@ class User(db.Model, SerializerMixin):
         }
 
 
+def iso_date(value):
+    """
+    Returns `value` (a date string such as 2025-3-7) as zero-padded YYYY-MM-DD,
+    or raises ValueError. Memo expiry dates are stored this way, so comparing
+    them as strings (archive.py, convert.py) orders them by date.
+    """
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise ValueError('Expiry date must be in YYYY-MM-DD format') from None
+
+
 # Memo Model
 class Memo(db.Model, SerializerMixin):
     __tablename__ = 'memos'
@@ -87,14 +128,28 @@ class Memo(db.Model, SerializerMixin):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String, nullable=False)
     memo_number = db.Column(db.String, unique=True, nullable=False)
-    expiry_date = db.Column(db.String, nullable=False)
+    expiry_date = db.Column(db.String, nullable=False, index=True)
     wholesaler_details = db.Column(db.Text, nullable=False)
     buyer_details = db.Column(db.Text, nullable=False)
     items = db.Column(db.Text, nullable=False)
     total_value = db.Column(db.Float, nullable=False)
     remarks = db.Column(db.Text)
-    company = db.Column(db.String, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    company = db.Column(db.String, nullable=False)  # The company's name, kept for the API and outbox
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String, nullable=False, server_default='open')  # 'closed' once converted to an invoice
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    # Bumped by SQLAlchemy on every UPDATE; used to key rendered PDFs.
+    # eager_defaults fetches server defaults with RETURNING instead of a later SELECT.
+    __mapper_args__ = {'version_id_col': version, 'eager_defaults': True}
+
+    # Serve the /api/documents timeline filtered by user or company
+    __table_args__ = (
+        db.Index('ix_memos_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_memos_company_id_created_at', 'company_id', 'created_at'),
+    )
 
     serialize_rules = ('-user.memos',)  # Avoid circular references
 
@@ -111,6 +166,26 @@ class Memo(db.Model, SerializerMixin):
             raise ValueError('Memo must have a company')
         return value
 
+    @validates('expiry_date')
+    def validate_expiry_date(self, key, value):
+        return iso_date(value)
+
+    def to_api_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "memo_number": self.memo_number,
+            "expiry_date": self.expiry_date,
+            "wholesaler_details": self.wholesaler_details,
+            "buyer_details": self.buyer_details,
+            "items": self.items,
+            "total_value": self.total_value,
+            "remarks": self.remarks,
+            "company": self.company,
+            "user_id": self.user_id,
+            "status": self.status,
+        }
+
 
 # Invoice Model
 class Invoice(db.Model, SerializerMixin):
@@ -123,8 +198,21 @@ class Invoice(db.Model, SerializerMixin):
     buyer_details = db.Column(db.Text, nullable=False)
     items = db.Column(db.Text, nullable=False)
     total_value = db.Column(db.Float, nullable=False)
-    company = db.Column(db.String, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    company = db.Column(db.String, nullable=False)  # The company's name, kept for the API and outbox
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    source_memo_id = db.Column(db.Integer, db.ForeignKey('memos.id', ondelete='SET NULL'))  # Set by /api/memos/convert
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version, 'eager_defaults': True}
+
+    __table_args__ = (
+        db.Index('ix_invoices_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_invoices_company_id_created_at', 'company_id', 'created_at'),
+        # A memo is converted at most once
+        db.UniqueConstraint('source_memo_id', name='uq_invoices_source_memo_id'),
+    )
 
     serialize_rules = ('-user.invoices',)  # Avoid circular references
 
@@ -141,5 +229,114 @@ class Invoice(db.Model, SerializerMixin):
             raise ValueError('Invoice must have a company')
         return value
 
+    def to_api_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "invoice_number": self.invoice_number,
+            "wholesaler_details": self.wholesaler_details,
+            "buyer_details": self.buyer_details,
+            "items": self.items,
+            "total_value": self.total_value,
+            "company": self.company,
+            "user_id": self.user_id,
+            "source_memo_id": self.source_memo_id,
+        }
 
 
+# Archive Models
+# Expired memos and old invoices are moved here by archive.py. The document is
+# stored as a zlib-compressed JSON copy of its to_api_dict(), so reading it back
+# gives exactly what the live endpoints return.
+class ArchivedMemo(db.Model):
+    __tablename__ = 'archived_memos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    memo_id = db.Column(db.Integer, unique=True, nullable=False)
+    company = db.Column(db.String, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+
+class ArchivedInvoice(db.Model):
+    __tablename__ = 'archived_invoices'
+
+    id = db.Column(db.Integer, primary_key=True)
+    invoice_id = db.Column(db.Integer, unique=True, nullable=False)
+    company = db.Column(db.String, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+
+# Document Counter Model
+# Next free memo/invoice number per company; advanced in blocks by numbering.py.
+class DocumentCounter(db.Model):
+    __tablename__ = 'document_counters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company = db.Column(db.String, nullable=False)
+    kind = db.Column(db.String, nullable=False)  # 'memo' or 'invoice'
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+
+    __table_args__ = (db.UniqueConstraint('company', 'kind', name='uq_document_counters_company_kind'),)
+
+
+# Change Event Model (transactional outbox)
+# One row is written in the same transaction as every memo/invoice create,
+# update and delete. The id is the change sequence consumed by stream.py.
+class ChangeEvent(db.Model):
+    __tablename__ = 'change_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company = db.Column(db.String, nullable=False)
+    entity = db.Column(db.String, nullable=False)     # 'memo' or 'invoice'
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String, nullable=False)         # 'created', 'updated', 'deleted' or 'archived'
+    payload = db.Column(db.Text)                      # to_api_dict() as JSON, NULL for deletes
+    # UTC, like the settle and retention cutoffs in sync.py it is compared with
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_change_events_company_id', 'company', 'id'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'company': self.company,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'op': self.op,
+            'data': json.loads(self.payload) if self.payload else None,
+        }
+
+
+# Attachment Model
+# Photos and certificates attached to a memo or an invoice. The file itself is
+# stored once per SHA-256 digest by attachments.py, so several attachments may
+# share the same content. memo_id/invoice_id have no foreign key because the
+# document may have been moved to the archive tables.
+class Attachment(db.Model):
+    __tablename__ = 'attachments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    memo_id = db.Column(db.Integer, index=True)
+    invoice_id = db.Column(db.Integer, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    filename = db.Column(db.String, nullable=False)
+    content_type = db.Column(db.String, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_api_dict(self):
+        return {
+            'id': self.id,
+            'memo_id': self.memo_id,
+            'invoice_id': self.invoice_id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'sha256': self.sha256,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
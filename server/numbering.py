@@ -0,0 +1,83 @@
+"""
+Server-side memo_number / invoice_number allocation.
+
+Numbers are sequential per company and document kind. Each worker reserves a
+block of NUMBER_BLOCK_SIZE values from the document_counters table in one short
+transaction (hi/lo), then hands them out from memory, so most allocations need
+no database round trip. The counter row is advanced atomically, so blocks never
+overlap between threads or gunicorn processes; values left in a block when a
+worker exits are simply skipped.
+
+Numbers look like MEMO-<counter id>-000042. The counter id keeps them unique
+across companies, since memo_number/invoice_number are unique table-wide.
+Clients may still supply their own numbers, but not ones of that form: the
+allocator could hand the same value out later (see check_client_number).
+"""
+import os
+import re
+import threading
+
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from config import db
+from models import DocumentCounter
+
+PREFIXES = {'memo': 'MEMO', 'invoice': 'INV'}
+
+
+def check_client_number(kind, number):
+    """
+    Raises ValueError if a client-supplied memo_number/invoice_number looks
+    like an allocated one, e.g. MEMO-3-000042.
+    """
+    if re.fullmatch(rf"{PREFIXES[kind]}-\d+-\d+", str(number)):
+        raise ValueError(f"{kind}_number values like {PREFIXES[kind]}-<n>-<n> are assigned by the server")
+
+
+class NumberAllocator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}  # (kind, company) -> [counter_id, next_value, end_value]
+
+    def next_number(self, kind, company):
+        key = (kind, company)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[1] >= block[2]:
+                block = self._reserve(kind, company)
+                self._blocks[key] = block
+            value = block[1]
+            block[1] += 1
+        return f"{PREFIXES[kind]}-{block[0]}-{value:06d}"
+
+    def _reserve(self, kind, company):
+        size = current_app.config['NUMBER_BLOCK_SIZE']
+        counters = DocumentCounter.__table__
+        where = (counters.c.company == company) & (counters.c.kind == kind)
+
+        # Separate connection and transaction: a reservation must stick even if
+        # the request that triggered it rolls back.
+        with db.engine.begin() as conn:
+            updated = conn.execute(
+                update(counters).where(where).values(next_value=counters.c.next_value + size)
+            ).rowcount
+            if not updated:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(insert(counters).values(company=company, kind=kind, next_value=1 + size))
+                except IntegrityError:
+                    # Another worker created the counter first
+                    conn.execute(update(counters).where(where).values(next_value=counters.c.next_value + size))
+            counter_id, end_value = conn.execute(select(counters.c.id, counters.c.next_value).where(where)).one()
+        return [counter_id, end_value - size, end_value]
+
+    def reset(self):
+        """Drops reserved blocks; a forked child must not reuse its parent's."""
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+
+allocator = NumberAllocator()
+os.register_at_fork(after_in_child=allocator.reset)
@@ -0,0 +1,53 @@
+"""
+Transactional outbox for memo and invoice changes.
+
+record_change() adds a ChangeEvent to the current session, so it is committed
+(or rolled back) together with the write it describes. Consumers such as the
+server-sent-events feed in stream.py read the table in id order.
+"""
+import json
+
+from sqlalchemy import insert
+
+from config import db
+from models import ChangeEvent
+
+
+def _event_values(entity, op, document, company=None):
+    return {
+        'company': company or document.company,
+        'entity': entity,
+        'entity_id': document.id,
+        'op': op,
+        'payload': None if op in ('deleted', 'archived') else json.dumps(document.to_api_dict()),
+    }
+
+
+def record_change(entity, op, document, company=None):
+    """
+    Queues a change event for `document`. Call after the document has been
+    flushed (so it has an id) and before db.session.commit().
+    """
+    db.session.add(ChangeEvent(**_event_values(entity, op, document, company)))
+
+
+def record_changes(entity, op, documents):
+    """Writes one event per document with a single executemany, for bulk operations."""
+    rows = [_event_values(entity, op, document) for document in documents]
+    if rows:
+        db.session.execute(insert(ChangeEvent), rows)
+
+
+def record_update(entity, document, old_company):
+    """
+    Queues an update; when the document moved to another company, subscribers
+    of the old company get a delete so their lists stay consistent.
+    """
+    if old_company != document.company:
+        # render_nulls keeps the delete (NULL payload) in the same executemany
+        db.session.execute(insert(ChangeEvent).execution_options(render_nulls=True), [
+            _event_values(entity, 'deleted', document, company=old_company),
+            _event_values(entity, 'created', document),
+        ])
+    else:
+        record_change(entity, 'updated', document)
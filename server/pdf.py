@@ -0,0 +1,117 @@
+"""
+Minimal PDF writer for memos and invoices.
+
+This module only depends on the standard library so it can be imported cheaply
+inside the render worker processes (see workers.py). Documents are laid out as
+plain Helvetica text, one line per field, wrapped and paginated.
+"""
+import textwrap
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 56
+FONT_SIZE = 10
+LEADING = 14
+WRAP_WIDTH = 95
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+
+
+def memo_lines(memo):
+    return [
+        "OrnaCloud Memo",
+        "",
+        f"Title: {memo['title']}",
+        f"Memo Number: {memo['memo_number']}",
+        f"Company: {memo['company']}",
+        f"Expiry Date: {memo['expiry_date']}",
+        "",
+        "Wholesaler:",
+        memo['wholesaler_details'],
+        "",
+        "Buyer:",
+        memo['buyer_details'],
+        "",
+        "Items:",
+        memo['items'],
+        "",
+        f"Total Value: {memo['total_value']}",
+        f"Remarks: {memo.get('remarks') or ''}",
+    ]
+
+
+def invoice_lines(invoice):
+    return [
+        "OrnaCloud Invoice",
+        "",
+        f"Title: {invoice['title']}",
+        f"Invoice Number: {invoice['invoice_number']}",
+        f"Company: {invoice['company']}",
+        "",
+        "Wholesaler:",
+        invoice['wholesaler_details'],
+        "",
+        "Buyer:",
+        invoice['buyer_details'],
+        "",
+        "Items:",
+        invoice['items'],
+        "",
+        f"Total Value: {invoice['total_value']}",
+    ]
+
+
+def _wrap(lines):
+    wrapped = []
+    for line in lines:
+        for part in str(line).splitlines() or ['']:
+            wrapped.extend(textwrap.wrap(part, WRAP_WIDTH) or [''])
+    return wrapped
+
+
+def _escape(text):
+    text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('latin-1', errors='replace')
+
+
+def build_pdf(lines):
+    lines = _wrap(lines)
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then a page/content pair per page.
+    page_ids = [4 + 2 * n for n in range(len(pages))]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % pid for pid in page_ids)
+           + b"] /Count %d >>" % len(pages),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    for page_id, page_lines in zip(page_ids, pages):
+        content = [b"BT", b"/F1 %d Tf" % FONT_SIZE, b"%d TL" % LEADING,
+                   b"%d %d Td" % (MARGIN, PAGE_HEIGHT - MARGIN)]
+        for line in page_lines:
+            content.append(b"(" + _escape(line) + b") '")
+        content.append(b"ET")
+        stream = b"\n".join(content)
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] " % (PAGE_WIDTH, PAGE_HEIGHT)
+            + b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_id + 1)
+        )
+        objects[page_id + 1] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for number in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def render_document(kind, document):
+    """Entry point for the worker pool: returns the PDF bytes for a serialized memo or invoice."""
+    lines = memo_lines(document) if kind == 'memo' else invoice_lines(document)
+    return build_pdf(lines)
@@ -0,0 +1,84 @@
+"""
+On-disk cache of rendered memo and invoice PDFs.
+
+Files are keyed by document kind, id and version (Memo.version/Invoice.version
+are bumped on every update), so a cached file is never served for a stale
+document. PATCH and DELETE also remove the old files eagerly to keep the cache
+directory small. Misses are rendered in the shared process pool.
+"""
+import glob
+import io
+import os
+import tempfile
+import zipfile
+
+from flask import current_app
+
+from pdf import render_document
+from workers import get_process_pool
+
+
+def _cache_dir():
+    path = current_app.config['PDF_CACHE_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_path(kind, document_id, version):
+    return os.path.join(_cache_dir(), f"{kind}-{document_id}-v{version}.pdf")
+
+
+def _store(path, data):
+    # A temp file of its own: another thread may be rendering the same miss
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def render_pdfs(kind, documents):
+    """
+    Returns the cached PDF path for each document, rendering all misses
+    concurrently in the worker pool.
+    """
+    paths = {}
+    pending = {}
+    for document in documents:
+        path = cache_path(kind, document.id, document.version)
+        if os.path.exists(path):
+            paths[document.id] = path
+        else:
+            future = get_process_pool().submit(render_document, kind, document.to_api_dict())
+            pending[document.id] = (path, future)
+
+    timeout = current_app.config['RENDER_TIMEOUT']
+    for document_id, (path, future) in pending.items():
+        _store(path, future.result(timeout=timeout))
+        paths[document_id] = path
+
+    return [paths[document.id] for document in documents]
+
+
+def render_pdf(kind, document):
+    return render_pdfs(kind, [document])[0]
+
+
+def invalidate_pdf(kind, document_id):
+    for path in glob.glob(os.path.join(_cache_dir(), f"{kind}-{document_id}-v*.pdf")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def zip_pdfs(named_paths):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, path in named_paths:
+            archive.write(path, name)
+    buffer.seek(0)
+    return buffer
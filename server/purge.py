@@ -0,0 +1,159 @@
+"""
+Soft deletion and background purge of users and categories.
+
+Deleting a user (DELETE /api/users/<id>) or a category (`flask delete-category`)
+only sets deleted_at, a single-row UPDATE. From then on the account cannot log
+in and the user's memos and invoices are left out of every read: the ids of
+users awaiting purge are kept in a small set, cached for READ_CACHE_TTL
+seconds, which reads filter on.
+
+`flask purge` (run it from cron) then removes the data in PURGE_BATCH_SIZE
+batches, one short transaction each, writing outbox delete events and
+invalidating caches as it goes. The user row goes last, once it has no
+documents left; ON DELETE CASCADE is only a safety net for anything missed.
+"""
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+
+from config import db, logger
+from models import ArchivedInvoice, ArchivedMemo, Attachment, Category, Invoice, Memo, User
+from outbox import record_changes
+from read_cache import memo_reads, invoice_reads
+from entity_cache import entities
+from pdf_cache import invalidate_pdf
+
+_hidden_lock = threading.Lock()
+_hidden = (0.0, frozenset())  # (expires_at, user ids awaiting purge)
+
+
+def hidden_user_ids():
+    """Ids of soft-deleted users whose documents must not be returned."""
+    global _hidden
+    if _hidden[0] > time.monotonic():
+        return _hidden[1]
+    with _hidden_lock:
+        if _hidden[0] <= time.monotonic():
+            ids = frozenset(db.session.scalars(select(User.id).where(User.deleted_at.isnot(None))))
+            _hidden = (time.monotonic() + current_app.config['READ_CACHE_TTL'], ids)
+        return _hidden[1]
+
+
+def hide_deleted(query, model):
+    """Filters a query or select on `model` down to documents of live users."""
+    hidden = hidden_user_ids()
+    return query.filter(model.user_id.notin_(hidden)) if hidden else query
+
+
+def _forget_hidden():
+    global _hidden
+    _hidden = (0.0, frozenset())
+    memo_reads.clear()
+    invoice_reads.clear()
+
+
+def soft_delete_user(user):
+    user.deleted_at = datetime.utcnow()
+    db.session.commit()
+    _forget_hidden()
+
+
+def soft_delete_category(category):
+    """Hides a category and every user in it; all of them are purged later."""
+    now = datetime.utcnow()
+    category.deleted_at = now
+    db.session.execute(
+        update(User)
+        .where(User.category_id == category.id, User.deleted_at.is_(None))
+        .values(deleted_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    _forget_hidden()
+
+
+def _purge_documents(model, kind, reads, user_id, batch_size):
+    purged = 0
+    while True:
+        rows = db.session.execute(
+            select(model.id, model.company).where(model.user_id == user_id).order_by(model.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return purged
+        ids = [row.id for row in rows]
+        record_changes(kind, 'deleted', rows)
+        Attachment.query.filter(getattr(Attachment, f"{kind}_id").in_(ids)).delete(synchronize_session=False)
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+        reads.invalidate(*{row.company for row in rows})
+        for document_id in ids:
+            entities.invalidate(model, document_id)
+            invalidate_pdf(kind, document_id)
+        purged += len(ids)
+
+
+def purge_user(user_id, batch_size):
+    memos = _purge_documents(Memo, 'memo', memo_reads, user_id, batch_size)
+    invoices = _purge_documents(Invoice, 'invoice', invoice_reads, user_id, batch_size)
+    for model in (ArchivedMemo, ArchivedInvoice, Attachment):
+        while True:
+            ids = db.session.scalars(select(model.id).where(model.user_id == user_id).limit(batch_size)).all()
+            if not ids:
+                break
+            model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+    User.query.filter_by(id=user_id).delete(synchronize_session=False)
+    db.session.commit()
+    return memos, invoices
+
+
+def purge(batch_size=None):
+    """Removes every soft-deleted user and category. Returns counts of what was removed."""
+    batch_size = batch_size or current_app.config['PURGE_BATCH_SIZE']
+    stats = {'users': 0, 'categories': 0, 'memos': 0, 'invoices': 0}
+    for user_id in db.session.scalars(select(User.id).where(User.deleted_at.isnot(None))).all():
+        memos, invoices = purge_user(user_id, batch_size)
+        stats['users'] += 1
+        stats['memos'] += memos
+        stats['invoices'] += invoices
+
+    for category in Category.query.filter(Category.deleted_at.isnot(None)).all():
+        # Its users were soft-deleted with it and purged above
+        if db.session.scalar(select(User.id).where(User.category_id == category.id).limit(1)) is None:
+            db.session.delete(category)
+            db.session.commit()
+            stats['categories'] += 1
+
+    _forget_hidden()
+    return stats
+
+
+@click.command('purge')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per transaction.')
+@with_appcontext
+def purge_command(batch_size):
+    """Remove soft-deleted users and categories and all their documents."""
+    stats = purge(batch_size)
+    logger.info(f"Purged {stats}.")
+    click.echo(
+        f"users: {stats['users']}, categories: {stats['categories']}, "
+        f"memos: {stats['memos']}, invoices: {stats['invoices']}"
+    )
+
+
+@click.command('delete-category')
+@click.argument('category_id', type=int)
+@with_appcontext
+def delete_category_command(category_id):
+    """Soft-delete a category and its users; `flask purge` removes them."""
+    category = db.session.get(Category, category_id)
+    if category is None:
+        raise click.ClickException(f"Category {category_id} does not exist.")
+    soft_delete_category(category)
+    click.echo(f"category {category.name}: deleted, run `flask purge` to remove its data")
@@ -0,0 +1,46 @@
+"""
+Statement budgets for the write endpoints.
+
+QUERY_BUDGETS maps "<endpoint>.<method>" to the most SQL statements that
+endpoint may send. tests/test_query_budgets.py exercises every listed endpoint
+and fails when one goes over, so a change that brings back a post-commit reload
+or an extra lookup is caught before it ships. Every statement counts, including
+those numbering.py and companies.py send on their own connections; the budgets
+are for a company the worker already knows, with a number block already
+reserved.
+
+A running app keeps the same count per request and only logs a warning when an
+endpoint is over budget. By then the request has committed, so failing it
+would turn a successful write into an error.
+"""
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import logger
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.statement_count = g.get('statement_count', 0) + 1
+
+
+def reset_count():
+    # g belongs to the app context, which a request shares with an enclosing
+    # one (e.g. a test's app context)
+    g.statement_count = 0
+
+
+def check_budget(response):
+    budget = current_app.config['QUERY_BUDGETS'].get(f"{request.endpoint}.{request.method.lower()}")
+    count = g.get('statement_count', 0)
+    if budget is not None and count > budget:
+        logger.warning(f"{request.method} {request.path} issued {count} SQL statements; its budget is {budget}.")
+    return response
+
+
+def init_app(app):
+    if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+    app.before_request(reset_count)
+    app.after_request(check_budget)
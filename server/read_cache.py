@@ -0,0 +1,105 @@
+"""
+Request coalescing and a short-TTL response cache for the company list reads
+(Memos.get and Invoices.get).
+
+Concurrent identical reads share a single in-flight computation: the first
+request runs the query, the others wait for its result. Results are then kept
+for READ_CACHE_TTL seconds. Writes call invalidate(company), which drops cached
+results and detaches any computation already in flight, so a read that started
+before the write is never cached or handed to requests arriving after it.
+
+The cache lives in each worker process; other processes see a write once their
+own entries expire, which is why the TTL is kept short.
+"""
+import threading
+import time
+
+from flask import current_app
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class CoalescingCache:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries = {}    # group -> {key: (expires_at, value)}
+        self._in_flight = {}  # group -> {key: _Call}
+        self._hits = 0
+        self._coalesced = 0
+        self._misses = 0
+
+    def get(self, group, key, compute):
+        """
+        Returns the cached value for (group, key), joining an in-flight
+        computation if there is one and running `compute` otherwise.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(group, {}).get(key)
+            if entry and entry[0] > now:
+                self._hits += 1
+                return entry[1]
+
+            call = self._in_flight.get(group, {}).get(key)
+            if call is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._in_flight.setdefault(group, {})[key] = call
+                self._misses += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                calls = self._in_flight.get(group, {})
+                # Only store the result if no write invalidated the group meanwhile.
+                if calls.get(key) is call:
+                    del calls[key]
+                    if call.error is None:
+                        ttl = current_app.config['READ_CACHE_TTL']
+                        self._entries.setdefault(group, {})[key] = (time.monotonic() + ttl, call.value)
+            call.event.set()
+        return call.value
+
+    def invalidate(self, *groups):
+        with self._lock:
+            for group in groups:
+                self._entries.pop(group, None)
+                self._in_flight.pop(group, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._in_flight.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._coalesced + self._misses
+            return {
+                'hits': self._hits,
+                'coalesced': self._coalesced,
+                'misses': self._misses,
+                'hit_ratio': (self._hits + self._coalesced) / total if total else 0.0,
+            }
+
+
+memo_reads = CoalescingCache('memos')
+invoice_reads = CoalescingCache('invoices')
@@ -8,10 +8,13 @@ import random
 from faker import Faker
 
 # Local imports
-from app import app
+from app import create_app
 from models import db, User, Memo, Invoice, Category
+from numbering import allocator
+from companies import companies
+
+app = create_app()
 
-@app.before_first_request
 def seed_categories():
     """
     Ensures the Category table has rows:
@@ -56,20 +59,25 @@ with app.app_context():
 
     # Delete all rows in the Memo table
     Memo.query.delete()
+    # Committed now: numbers and companies below are written on their own
+    # connections, which SQLite would block behind this open delete
+    db.session.commit()
 
     # Create an empty list for memos
     memos = []
     for _ in range(20):  # Seed 20 memos
+        company = companies.resolve(fake.company())
         memo = Memo(
             title=fake.sentence(),
-            memo_number=fake.uuid4(),
+            memo_number=allocator.next_number('memo', company.name),
             expiry_date=fake.future_date().strftime('%Y-%m-%d'),
             wholesaler_details=fake.address(),
             buyer_details=fake.address(),
             items=fake.text(),
             total_value=randint(100, 10000),
             remarks=fake.sentence(),
-            company=fake.company(),
+            company=company.name,
+            company_id=company.id,
             user_id=rc(users).id  # Assign to a random user
         )
         memos.append(memo)
@@ -79,18 +87,21 @@ with app.app_context():
 
     # Delete all rows in the Invoice table
     Invoice.query.delete()
+    db.session.commit()
 
     # Create an empty list for invoices
     invoices = []
     for _ in range(20):  # Seed 20 invoices
+        company = companies.resolve(fake.company())
         invoice = Invoice(
             title=fake.sentence(),
-            invoice_number=fake.uuid4(),
+            invoice_number=allocator.next_number('invoice', company.name),
             wholesaler_details=fake.address(),
             buyer_details=fake.address(),
             items=fake.text(),
             total_value=randint(100, 10000),
-            company=fake.company(),
+            company=company.name,
+            company_id=company.id,
             user_id=rc(users).id  # Assign to a random user
         )
         invoices.append(invoice)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Server-sent events change feed.
+
+Runs as its own process next to the Flask app:
+
+    python stream.py
+
+and serves GET /api/stream?company=<name>. Every client connection is held by
+a single asyncio event loop instead of a WSGI thread. One background task polls
+the change_events outbox (see outbox.py) and fans new rows out to the
+connections subscribed to that company, so the database sees one small indexed
+query per poll interval no matter how many clients are connected.
+
+Each event carries a change_events id, so a reconnecting EventSource resumes
+with the standard Last-Event-ID header and missed events are replayed from the
+outbox. On PostgreSQL, ids can commit out of order, so the poll and that id
+stay behind events still within SYNC_SETTLE_SECONDS, as the sync cursor does
+(see sync.py); an event that commits late is still delivered, and a reconnect
+may resend a few events. A slow client whose buffer fills up is disconnected and catches up the
+same way.
+"""
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlsplit
+
+from app import create_app
+from companies import companies, company_key
+from config import logger
+from models import ChangeEvent
+from sync import latest_cursor, settled_cutoff
+
+app = create_app()
+
+REPLAY_PAGE_SIZE = 500
+
+
+def _events_after(last_id, company=None, limit=REPLAY_PAGE_SIZE):
+    """
+    Returns the events after `last_id` in id order, and the id up to which
+    they are settled: no lower id can still commit (see sync.settled_cutoff),
+    so a client can resume from there without missing anything.
+    """
+    with app.app_context():
+        query = ChangeEvent.query.filter(ChangeEvent.id > last_id)
+        if company:
+            query = query.filter(ChangeEvent.company == company)
+        events = query.order_by(ChangeEvent.id).limit(limit).all()
+        settled = settled_cutoff()
+        settled_id = last_id
+        for event in events:
+            if settled is not None and event.created_at >= settled:
+                break
+            settled_id = event.id
+        return [event.to_dict() for event in events], settled_id
+
+
+def _latest_event_id():
+    with app.app_context():
+        return latest_cursor()
+
+
+def _canonical_company(name):
+    """
+    The company's stored spelling, which events carry, e.g. "Acme" for "acme".
+    A company that has no documents yet keeps the requested name.
+    """
+    with app.app_context():
+        found = companies.lookup(name)
+    return found.name if found else ' '.join(name.split())
+
+
+def _session_user_id(cookie_header):
+    """Reads user_id from the Flask session cookie set by /login."""
+    cookies = SimpleCookie()
+    cookies.load(cookie_header or '')
+    morsel = cookies.get(app.config['SESSION_COOKIE_NAME'])
+    if morsel is None:
+        return None
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        data = serializer.loads(morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return None
+    return data.get('user_id')
+
+
+def _format_event(event, resume_id):
+    # The SSE id is where a reconnect resumes, which may be below the event's
+    # own id while lower ids can still commit; resent events are harmless.
+    return f"id: {resume_id}\ndata: {json.dumps(event)}\n\n".encode('utf-8')
+
+
+class Subscription:
+    def __init__(self, company):
+        self.key = company_key(company)
+        self.queue = asyncio.Queue(maxsize=app.config['STREAM_QUEUE_SIZE'])
+        self.overflowed = False
+
+
+class Broker:
+    def __init__(self):
+        self.subscriptions = {}  # company_key() -> set of Subscription
+        self.last_id = 0         # Every event up to this id has been published
+        self.published = set()   # Published ids above last_id
+
+    def subscribe(self, company):
+        subscription = Subscription(company)
+        self.subscriptions.setdefault(subscription.key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self.subscriptions.get(subscription.key)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscriptions[subscription.key]
+
+    def publish(self, event, resume_id):
+        for subscription in list(self.subscriptions.get(company_key(event['company']), ())):
+            try:
+                subscription.queue.put_nowait((event, resume_id))
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.last_id = await loop.run_in_executor(None, _latest_event_id)
+        while True:
+            await asyncio.sleep(app.config['STREAM_POLL_INTERVAL'])
+            try:
+                events, settled_id = await loop.run_in_executor(None, _events_after, self.last_id)
+            except Exception as e:
+                logger.error(f"Error polling change events: {e}")
+                continue
+            self.deliver(events, settled_id)
+
+    def deliver(self, events, settled_id):
+        """
+        Publishes the events of one poll that have not been published yet. The
+        poll starts at last_id, so an event that commits after a higher id was
+        published is still picked up while it is within the settle window.
+        """
+        for event in events:
+            if event['id'] not in self.published:
+                self.published.add(event['id'])
+                self.publish(event, min(event['id'], settled_id))
+        self.last_id = settled_id
+        self.published = {event_id for event_id in self.published if event_id > settled_id}
+
+
+broker = Broker()
+
+
+async def _respond(writer, status, body, origin=None):
+    payload = json.dumps(body).encode('utf-8')
+    writer.write(
+        f"HTTP/1.1 {status}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"{_cors_headers(origin)}"
+        "Connection: close\r\n\r\n".encode('latin-1') + payload
+    )
+    await writer.drain()
+
+
+def _cors_headers(origin):
+    if not origin:
+        return ""
+    return f"Access-Control-Allow-Origin: {origin}\r\nAccess-Control-Allow-Credentials: true\r\n"
+
+
+async def _stream(writer, company, last_event_id, origin):
+    loop = asyncio.get_running_loop()
+    subscription = broker.subscribe(company)
+    try:
+        writer.write(
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n"
+            f"{_cors_headers(origin)}"
+            "Connection: keep-alive\r\n\r\n"
+            "retry: 3000\n\n".encode('latin-1')
+        )
+
+        replayed = set()
+        if last_event_id is None:
+            # An id-only event sets the client's Last-Event-ID without
+            # dispatching anything, so a reconnect resumes from here.
+            resume_id = broker.last_id
+            writer.write(f"id: {resume_id}\n\n".encode('latin-1'))
+        else:
+            resume_id = after = last_event_id
+            while True:
+                backlog, settled_id = await loop.run_in_executor(None, _events_after, after, company)
+                for event in backlog:
+                    resume_id = max(resume_id, min(event['id'], settled_id))
+                    writer.write(_format_event(event, resume_id))
+                    replayed.add(event['id'])
+                    after = event['id']
+                await writer.drain()
+                if len(backlog) < REPLAY_PAGE_SIZE:
+                    break
+        await writer.drain()
+
+        heartbeat = app.config['STREAM_HEARTBEAT']
+        while not subscription.overflowed:
+            try:
+                event, event_resume_id = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                writer.write(b": keep-alive\n\n")
+                await writer.drain()
+                continue
+            if event['id'] in replayed:
+                continue
+            resume_id = max(resume_id, event_resume_id)
+            writer.write(_format_event(event, resume_id))
+            await writer.drain()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def handle_connection(reader, writer):
+    try:
+        request_line = (await reader.readline()).decode('latin-1')
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        parts = request_line.split(' ')
+        if len(parts) < 2:
+            return
+        method, target = parts[0], parts[1]
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        origin = headers.get('origin')
+
+        if method != 'GET' or url.path != '/api/stream':
+            await _respond(writer, '404 Not Found', {'error': 'Not found'}, origin)
+            return
+
+        company = params.get('company', [None])[0]
+        if not company or not company_key(company):
+            await _respond(writer, '400 Bad Request', {'error': 'Company parameter is required'}, origin)
+            return
+
+        if _session_user_id(headers.get('cookie')) is None:
+            await _respond(writer, '401 Unauthorized', {'error': 'User not authenticated'}, origin)
+            return
+
+        last_event_id = headers.get('last-event-id') or params.get('last_event_id', [None])[0]
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        # Subscriptions match any spelling; the replay query needs the stored one
+        company = await asyncio.get_running_loop().run_in_executor(None, _canonical_company, company)
+        await _stream(writer, company, last_event_id, origin)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except Exception as e:
+        logger.error(f"Error in change stream: {e}")
+    finally:
+        writer.close()
+
+
+async def main():
+    poller = asyncio.ensure_future(broker.run())
+    server = await asyncio.start_server(
+        handle_connection, app.config['STREAM_HOST'], app.config['STREAM_PORT']
+    )
+    logger.info(f"Change stream listening on {app.config['STREAM_HOST']}:{app.config['STREAM_PORT']}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        poller.cancel()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
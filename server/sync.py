@@ -0,0 +1,142 @@
+"""
+Incremental delta sync for memos and invoices.
+
+GET /api/sync?company=<name>&since=<cursor> returns the memos and invoices of a
+company that were created, updated, deleted or archived after `since`. The
+cursor is a change_events id (see outbox.py), so a sync reads only the outbox
+rows written since the last one, through the (company, id) index, however big
+the live tables are. Several changes to one document within a page collapse
+into its latest state; deletes and archives come back as tombstones with
+"data": null, and so do documents of soft-deleted users.
+
+The id is assigned when an event is inserted, not when it commits. On SQLite a
+writer holds the database lock until it commits, so ids become visible in
+order. On PostgreSQL a transaction can commit event 41 after another one has
+committed event 42; a reader that moved its cursor to 42 would never see 41.
+So the cursor only moves past events older than SYNC_SETTLE_SECONDS: newer
+ones are returned but sent again by the next sync, which is harmless because
+every change carries the document's full latest state. The window must be
+longer than any write transaction.
+
+Events, and therefore tombstones, are kept for SYNC_RETENTION_DAYS and removed
+with `flask prune-changes`. A cursor older than that gets 410 Gone: the client
+must take a fresh cursor (call /api/sync without `since`) and then reload the
+company with /memos and /invoices.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from config import db, logger
+from models import ChangeEvent
+from purge import hidden_user_ids
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def settled_cutoff():
+    """
+    Events created before this are settled: no lower id can still commit.
+    None when every visible event is settled, as on SQLite.
+    """
+    window = current_app.config['SYNC_SETTLE_SECONDS']
+    if not window or db.engine.dialect.name == 'sqlite':
+        return None
+    return datetime.utcnow() - timedelta(seconds=window)
+
+
+def latest_cursor():
+    query = db.session.query(func.max(ChangeEvent.id))
+    settled = settled_cutoff()
+    if settled is not None:
+        query = query.filter(ChangeEvent.created_at < settled)
+    return query.scalar() or 0
+
+
+def changes_since(company, since, limit):
+    """
+    Returns (changes, cursor, has_more) for the events of `company` after
+    `since`. Raises CursorExpired when events after `since` have been pruned.
+    """
+    oldest = db.session.query(func.min(ChangeEvent.id)).scalar()
+    if oldest is not None and since < oldest - 1:
+        raise CursorExpired()
+
+    events = (
+        ChangeEvent.query
+        .filter(ChangeEvent.company == company, ChangeEvent.id > since)
+        .order_by(ChangeEvent.id)
+        .limit(limit)
+        .all()
+    )
+    latest = {}
+    for event in events:
+        latest.pop((event.entity, event.entity_id), None)
+        latest[(event.entity, event.entity_id)] = event
+    changes = []
+    hidden = hidden_user_ids()
+    for event in latest.values():
+        change = event.to_dict()
+        del change['company']
+        if change['data'] and change['data']['user_id'] in hidden:
+            # The owner was soft-deleted (see purge.py): clients drop it now,
+            # before `flask purge` writes the real delete.
+            change.update(op='deleted', data=None)
+        changes.append(change)
+
+    cursor = since
+    settled = settled_cutoff()
+    for event in events:
+        if settled is not None and event.created_at >= settled:
+            break  # Resent next time, after any lower ids have had time to commit
+        cursor = event.id
+    return changes, cursor, len(events) == limit and cursor > since
+
+
+def prune_changes(retention_days=None, batch_size=None):
+    """
+    Deletes change events older than the retention window, one batch per
+    transaction. The newest event is always kept so ids keep increasing (SQLite
+    reuses the ids of deleted rows at the end of a table).
+    """
+    if retention_days is None:
+        retention_days = current_app.config['SYNC_RETENTION_DAYS']
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    last_id = (
+        db.session.query(ChangeEvent.id)
+        .filter(ChangeEvent.created_at < cutoff, ChangeEvent.id < latest_cursor())
+        .order_by(ChangeEvent.id.desc())
+        .limit(1)
+        .scalar()
+    )
+    pruned = 0
+    while last_id is not None:
+        ids = [
+            row.id for row in
+            db.session.query(ChangeEvent.id).filter(ChangeEvent.id <= last_id)
+            .order_by(ChangeEvent.id).limit(batch_size)
+        ]
+        if not ids:
+            break
+        ChangeEvent.query.filter(ChangeEvent.id <= ids[-1]).delete(synchronize_session=False)
+        db.session.commit()
+        pruned += len(ids)
+    return pruned
+
+
+@click.command('prune-changes')
+@click.option('--days', type=int, default=None, help='Keep change events for this many days.')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per transaction.')
+@with_appcontext
+def prune_command(days, batch_size):
+    """Delete change events (and sync tombstones) past the retention window."""
+    pruned = prune_changes(retention_days=days, batch_size=batch_size)
+    logger.info(f"Pruned {pruned} change events.")
+    click.echo(f"change events: {pruned} rows pruned")
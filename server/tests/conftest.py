@@ -0,0 +1,89 @@
+"""
+Shared fixtures. Tests run the 'testing' profile against a throwaway SQLite
+file (or TEST_DATABASE_URL), not an in-memory database, so the separate
+connections of numbering.py and companies.py and concurrent request threads
+behave as they do in production.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault('TEST_DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+from app import create_app  # noqa: E402  (config reads TEST_DATABASE_URL on import)
+from companies import companies  # noqa: E402
+from config import db  # noqa: E402
+from entity_cache import entities  # noqa: E402
+from group_commit import writer  # noqa: E402
+from limits import LocalBackend, limiter  # noqa: E402
+from models import Category  # noqa: E402
+from numbering import allocator  # noqa: E402
+from purge import _forget_hidden  # noqa: E402
+
+MEMO = {
+    'title': 'Ring order', 'expiry_date': '2099-01-01', 'wholesaler_details': 'Wholesaler',
+    'buyer_details': 'Buyer', 'items': 'Rings', 'total_value': 100.0, 'company': 'Acme',
+}
+INVOICE = {
+    'title': 'Ring invoice', 'wholesaler_details': 'Wholesaler', 'buyer_details': 'Buyer',
+    'items': 'Rings', 'total_value': 100.0, 'company': 'Acme',
+}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing')
+    app.config.update(PDF_CACHE_DIR=str(tmp_path / 'pdf_cache'), ATTACHMENT_DIR=str(tmp_path / 'attachments'))
+    with app.app_context():
+        db.create_all()
+        db.session.add(Category(name='Wholesale'))
+        db.session.commit()
+        try:
+            yield app
+        finally:
+            db.session.remove()
+            db.drop_all()
+            # Per-worker state would otherwise leak ids into the next test
+            for state in (companies, allocator, writer):
+                state.reset()
+            entities.clear()
+            limiter.backend = LocalBackend()
+            _forget_hidden()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def sign_up(app):
+    """Signs up a user on a client (a new one by default) and returns (client, user)."""
+    def sign_up(username='alice', client=None):
+        client = client or app.test_client()
+        response = client.post('/signup', json={
+            'username': username, 'password': 'secret', 'name': username.title(), 'lastname': 'Tester',
+            'category_id': 1,
+        })
+        assert response.status_code == 201, response.get_json()
+        return client, response.get_json()
+    return sign_up
+
+
+def create_memo(client, **fields):
+    """Creates a memo and returns its id."""
+    response = client.post('/memos', json={**MEMO, **fields})
+    assert response.status_code == 201, response.get_json()
+    number = response.get_json()['memo_number']
+    memos = client.get('/memos', query_string={'company': fields.get('company', MEMO['company'])}).get_json()
+    return next(memo['id'] for memo in memos if memo['memo_number'] == number)
+
+
+def create_invoice(client, **fields):
+    """Creates an invoice and returns its id."""
+    response = client.post('/invoices', json={**INVOICE, **fields})
+    assert response.status_code == 201, response.get_json()
+    number = response.get_json()['invoice_number']
+    invoices = client.get('/invoices', query_string={'company': fields.get('company', INVOICE['company'])}).get_json()
+    return next(invoice['id'] for invoice in invoices if invoice['invoice_number'] == number)
@@ -0,0 +1,32 @@
+from datetime import date
+
+from archive import archive_memos
+from conftest import MEMO, create_memo
+from models import ArchivedMemo, Memo
+
+
+def test_expiry_dates_are_stored_zero_padded(app, sign_up):
+    client, _ = sign_up()
+    memo_id = create_memo(client, expiry_date='2024-1-5')
+    assert client.get(f"/api/memos/{memo_id}").get_json()['expiry_date'] == '2024-01-05'
+
+
+def test_malformed_expiry_date_is_rejected(app, sign_up):
+    client, _ = sign_up()
+    assert client.post('/memos', json={**MEMO, 'expiry_date': '05/01/2024'}).status_code == 400
+    memo_id = create_memo(client)
+    response = client.patch(f"/api/memos/{memo_id}", json={'expiry_date': 'soon'})
+    assert response.status_code == 400
+    assert client.get(f"/api/memos/{memo_id}").get_json()['expiry_date'] == '2099-01-01'
+
+
+def test_archive_compares_expiry_as_dates(app, sign_up):
+    client, _ = sign_up()
+    expired = create_memo(client, expiry_date='2024-1-5')
+    current = create_memo(client, expiry_date='2024-12-1')
+
+    stats = archive_memos(today=date(2024, 1, 10))
+
+    assert stats['rows'] == 1
+    assert ArchivedMemo.query.filter_by(memo_id=expired).count() == 1
+    assert Memo.query.filter_by(id=current).count() == 1
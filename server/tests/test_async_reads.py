@@ -0,0 +1,58 @@
+"""async_reads.py serves the same bodies as the Flask endpoints it mirrors."""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import async_reads
+from config import db
+from conftest import create_invoice, create_memo
+
+
+@pytest.fixture
+def read_async(app, monkeypatch):
+    url = db.engine.url.set(drivername='sqlite+aiosqlite')
+
+    def read_async(path, **params):
+        async def read():
+            engine = create_async_engine(url)
+            monkeypatch.setattr(async_reads, 'Session', async_sessionmaker(engine, expire_on_commit=False))
+            try:
+                return await async_reads.route('GET', path, {name: [value] for name, value in params.items()})
+            finally:
+                await engine.dispose()
+        return asyncio.run(read())
+    return read_async
+
+
+def _read_sync(client, path, **params):
+    response = client.get(path, query_string=params)
+    return response.status_code, response.get_json()
+
+
+def test_reads_match_the_flask_app(app, sign_up, read_async):
+    client, user = sign_up()
+    create_memo(client)
+    create_invoice(client, company='Globex')
+
+    for path, params in [
+        ('/memos', {'company': 'acme'}),
+        ('/invoices', {'company': 'Globex'}),
+        (f"/api/companies/{user['id']}", {}),
+    ]:
+        assert read_async(path, **params) == _read_sync(client, path, **params)
+
+
+def test_soft_deleted_users_are_hidden_alike(app, sign_up, read_async):
+    client, user = sign_up()
+    create_memo(client)
+    create_invoice(client)
+    assert client.delete(f"/api/users/{user['id']}").status_code == 200
+    reader = app.test_client()
+
+    for path, params in [
+        ('/memos', {'company': 'Acme'}),
+        ('/invoices', {'company': 'Acme'}),
+        (f"/api/companies/{user['id']}", {}),
+    ]:
+        assert read_async(path, **params) == _read_sync(reader, path, **params) == (200, [])
@@ -0,0 +1,39 @@
+from conftest import MEMO
+from limits import limiter
+
+
+def test_batch_runs_reads_and_writes_in_order(app, sign_up):
+    client, user = sign_up()
+    response = client.post('/api/batch', json={'requests': [
+        {'id': 'before', 'method': 'GET', 'path': '/memos?company=Acme'},
+        {'id': 'create', 'method': 'POST', 'path': '/memos', 'body': MEMO},
+        {'id': 'after', 'method': 'GET', 'path': '/memos?company=Acme'},
+        {'id': 'companies', 'method': 'GET', 'path': f"/api/companies/{user['id']}"},
+    ]})
+
+    assert response.status_code == 200
+    responses = {item['id']: item for item in response.get_json()['responses']}
+    assert [item['id'] for item in response.get_json()['responses']] == ['before', 'create', 'after', 'companies']
+    assert responses['before']['body'] == []
+    assert responses['create']['status'] == 201
+    assert [memo['memo_number'] for memo in responses['after']['body']] == [responses['create']['body']['memo_number']]
+
+
+def test_batched_write_releases_its_admission(app, sign_up):
+    app.config['RATE_LIMIT_ENABLED'] = True
+    client, _ = sign_up()
+
+    for _ in range(3):
+        response = client.post('/api/batch', json={'requests': [
+            {'method': 'GET', 'path': '/memos?company=Acme'},
+            {'method': 'POST', 'path': '/memos', 'body': MEMO},
+        ]})
+        assert [item['status'] for item in response.get_json()['responses']] == [200, 201]
+        assert limiter._in_flight == 0
+
+
+def test_malformed_batch_is_rejected(app, sign_up):
+    client, _ = sign_up()
+    assert client.post('/api/batch', json={'requests': []}).status_code == 400
+    assert client.post('/api/batch', json={'requests': [{'method': 'PUT', 'path': '/memos'}]}).status_code == 400
+    assert client.post('/api/batch', json={'requests': [{'path': '/api/batch'}]}).status_code == 400
@@ -0,0 +1,29 @@
+from conftest import create_memo
+
+
+def test_spellings_share_one_company(app, sign_up):
+    client, user = sign_up()
+    create_memo(client, company='Acme  Inc')
+    create_memo(client, company='acme inc')
+
+    memos = client.get('/memos', query_string={'company': 'ACME INC'}).get_json()
+    assert [memo['company'] for memo in memos] == ['Acme Inc', 'Acme Inc']
+    assert client.get(f"/api/companies/{user['id']}").get_json() == ['Acme Inc']
+
+
+def test_suggest_matches_prefixes(app, sign_up):
+    client, _ = sign_up()
+    for name in ('Acme', 'Acme Inc', 'Acorn', 'Globex'):
+        create_memo(client, company=name)
+
+    def suggest(**params):
+        response = client.get('/api/companies/suggest', query_string=params)
+        assert response.status_code == 200
+        return [company['name'] for company in response.get_json()]
+
+    assert suggest(q='ac') == ['Acme', 'Acme Inc', 'Acorn']
+    assert suggest(q='  ACME ') == ['Acme', 'Acme Inc']
+    assert suggest(q='ac', limit=2) == ['Acme', 'Acme Inc']
+    assert suggest(q='zeta') == []
+    assert suggest(q='') == []
+    assert set(client.get('/api/companies/suggest', query_string={'q': 'g'}).get_json()[0]) == {'id', 'name'}
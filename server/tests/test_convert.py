@@ -0,0 +1,52 @@
+import json
+import re
+
+from conftest import INVOICE, create_memo
+from models import ChangeEvent
+
+
+def _convert(client, **body):
+    response = client.post('/api/memos/convert', json=body)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['converted']
+
+
+def test_converted_invoices_get_allocated_numbers(app, sign_up):
+    client, _ = sign_up()
+    # Used to become INV-LEGACY-7 and collide with this invoice on every retry
+    assert client.post('/invoices', json={**INVOICE, 'invoice_number': 'INV-LEGACY-7'}).status_code == 201
+    legacy = create_memo(client, memo_number='LEGACY-7')
+    other = create_memo(client)
+
+    converted = _convert(client, memo_ids=[other, legacy])
+
+    assert [row['memo_id'] for row in converted] == [legacy, other]
+    numbers = [row['invoice_number'] for row in converted]
+    assert all(re.fullmatch(r'INV-[1-9]\d*-\d{6}', number) for number in numbers)
+    assert len(set(numbers)) == 2
+    invoices = client.get('/invoices', query_string={'company': 'Acme'}).get_json()
+    assert {invoice['invoice_number'] for invoice in invoices} == {'INV-LEGACY-7', *numbers}
+
+
+def test_memos_are_converted_once(app, sign_up):
+    client, _ = sign_up()
+    memo_id = create_memo(client)
+    assert len(_convert(client, memo_ids=[memo_id])) == 1
+    assert _convert(client, memo_ids=[memo_id]) == []
+
+
+def test_convert_by_filter_and_close(app, sign_up):
+    client, _ = sign_up()
+    acme = create_memo(client)
+    globex = create_memo(client, company='Globex')
+    other_client, _ = sign_up('bob')
+    create_memo(other_client)
+
+    converted = _convert(client, filter={'company': ' acme'}, close_memos=True)
+
+    assert [row['memo_id'] for row in converted] == [acme]
+    memo = client.get(f"/api/memos/{acme}").get_json()
+    assert memo['status'] == 'closed'
+    event = ChangeEvent.query.filter_by(entity='memo', entity_id=acme).order_by(ChangeEvent.id.desc()).first()
+    assert (event.op, json.loads(event.payload)['status']) == ('updated', 'closed')
+    assert client.get(f"/api/memos/{globex}").get_json()['status'] == 'open'
@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from config import db
+from conftest import create_invoice, create_memo
+from entity_cache import entities
+
+
+@contextmanager
+def memo_queries():
+    queries = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT') and 'FROM memos' in statement:
+            queries.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        yield queries
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+
+def test_reads_hit_the_cache_and_writes_go_through(app, sign_up):
+    client, _ = sign_up()
+    memo_id = create_memo(client)
+    assert client.get(f"/api/memos/{memo_id}").status_code == 200
+
+    with memo_queries() as queries:
+        assert client.get(f"/api/memos/{memo_id}").get_json()['title'] == 'Ring order'
+        assert client.patch(f"/api/memos/{memo_id}", json={'title': 'Edited'}).status_code == 200
+        queries.clear()  # The PATCH loads the memo it updates
+        assert client.get(f"/api/memos/{memo_id}").get_json()['title'] == 'Edited'
+    assert queries == []
+
+    assert client.delete(f"/api/memos/{memo_id}").status_code == 200
+    assert client.get(f"/api/memos/{memo_id}").status_code == 404
+
+
+def test_multi_get_keeps_order_and_skips_missing(app, sign_up):
+    client, _ = sign_up()
+    first, second = create_memo(client), create_memo(client)
+    client.get(f"/api/memos/{second}")  # One cached, one not
+
+    response = client.get('/api/memos', query_string={'ids': f"{second},999,{first},{second}"})
+
+    assert response.status_code == 200
+    assert [memo['id'] for memo in response.get_json()] == [second, first]
+    assert client.get('/api/memos', query_string={'ids': 'x'}).status_code == 400
+    assert client.get('/api/memos', query_string={'ids': ','.join(['1'] * 201)}).status_code == 400
+    assert client.get('/api/invoices', query_string={'ids': str(create_invoice(client))}).status_code == 200
+
+
+def test_multi_get_reads_the_shared_tier_in_bulk(app, sign_up, monkeypatch):
+    client, _ = sign_up()
+    ids = [create_memo(client) for _ in range(3)]
+    client.get('/api/memos', query_string={'ids': ','.join(map(str, ids))})
+    entities.clear()  # As in another worker: only the shared tier has them
+
+    calls = []
+    get_many = entities.shared.get_many
+    monkeypatch.setattr(entities.shared, 'get_many', lambda keys: calls.append(keys) or get_many(keys))
+    monkeypatch.setattr(entities.shared, 'get', None)
+    with memo_queries() as queries:
+        response = client.get('/api/memos', query_string={'ids': ','.join(map(str, ids))})
+
+    assert [memo['id'] for memo in response.get_json()] == ids
+    assert queries == []
+    assert [len(keys) for keys in calls] == [3, 3]  # Pointers, then entries
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from conftest import MEMO, create_memo
+from group_commit import writer
+from models import Memo
+
+CONCURRENT_WRITES = 8
+
+
+def test_concurrent_writes_share_one_commit(app, sign_up):
+    client, _ = sign_up()
+    create_memo(client)  # Creates the company and reserves a number block
+    app.config.update(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=500)
+    before = writer.stats()
+
+    barrier = threading.Barrier(CONCURRENT_WRITES)
+    statuses = []
+
+    def write():
+        barrier.wait()
+        statuses.append(client.post('/memos', json=MEMO).status_code)
+
+    threads = [threading.Thread(target=write) for _ in range(CONCURRENT_WRITES)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    after = writer.stats()
+    assert statuses == [201] * CONCURRENT_WRITES
+    assert after['batches'] - before['batches'] == 1
+    assert after['writes'] - before['writes'] == CONCURRENT_WRITES
+    assert Memo.query.count() == CONCURRENT_WRITES + 1
+
+
+def test_timed_out_write_is_not_committed_later(app, sign_up):
+    client, _ = sign_up()
+    create_memo(client)
+    app.config.update(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=0, GROUP_COMMIT_TIMEOUT=0.1)
+    busy = writer.submit(app, time.sleep, (0.5,))  # Keeps the writer occupied
+
+    response = client.post('/memos', json=MEMO)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    busy.result(timeout=5)
+    writer.submit(app, lambda: None, ()).result(timeout=5)  # The next batch has run too
+    assert Memo.query.count() == 1
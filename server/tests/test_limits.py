@@ -0,0 +1,31 @@
+import pytest
+
+from conftest import MEMO
+
+
+@pytest.fixture
+def limited(app):
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMITS={'default': (100, 60), 'memos.post': (3, 60)})
+    return app
+
+
+def test_exhausted_limit_returns_429_with_retry_after(limited, sign_up):
+    client, _ = sign_up()
+    for _ in range(3):
+        assert client.post('/memos', json=MEMO).status_code == 201
+
+    response = client.post('/memos', json=MEMO)
+
+    assert response.status_code == 429
+    assert response.get_json() == {'error': 'Too many requests'}
+    assert 1 <= int(response.headers['Retry-After']) <= 20
+
+
+def test_each_method_has_its_own_bucket(limited, sign_up):
+    client, _ = sign_up()
+    for _ in range(3):
+        assert client.post('/memos', json=MEMO).status_code == 201
+    assert client.post('/memos', json=MEMO).status_code == 429
+
+    for _ in range(10):
+        assert client.get('/memos', query_string={'company': 'Acme'}).status_code == 200
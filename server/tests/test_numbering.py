@@ -0,0 +1,28 @@
+from conftest import INVOICE, MEMO, create_memo
+
+
+def test_allocated_numbers_cannot_be_supplied(app, sign_up):
+    client, _ = sign_up()
+    response = client.post('/memos', json={**MEMO, 'memo_number': 'MEMO-1-000002'})
+    assert response.status_code == 400
+    # The allocator is still free to hand that number out
+    assert client.post('/memos', json=MEMO).get_json()['memo_number'] == 'MEMO-1-000001'
+    assert client.post('/memos', json=MEMO).get_json()['memo_number'] == 'MEMO-1-000002'
+
+
+def test_own_numbers_are_kept(app, sign_up):
+    client, _ = sign_up()
+    response = client.post('/invoices', json={**INVOICE, 'invoice_number': 'LEGACY-7'})
+    assert response.status_code == 201
+    assert response.get_json()['invoice_number'] == 'LEGACY-7'
+
+
+def test_patch_keeps_an_allocated_number_but_cannot_pick_one(app, sign_up):
+    client, _ = sign_up()
+    memo_id = create_memo(client)
+    memo = client.get(f"/api/memos/{memo_id}").get_json()
+
+    # The edit page sends the memo back with its number unchanged
+    assert client.patch(f"/api/memos/{memo_id}", json={**memo, 'title': 'Edited'}).status_code == 200
+    assert client.patch(f"/api/memos/{memo_id}", json={'memo_number': 'MEMO-1-000005'}).status_code == 400
+    assert client.patch(f"/api/memos/{memo_id}", json={'memo_number': 'R-2024-17'}).status_code == 200
@@ -0,0 +1,68 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import pdf_cache
+from conftest import create_memo
+
+
+@pytest.fixture
+def renders(app, monkeypatch):
+    """Renders in threads instead of the process pool and records each render."""
+    rendered = []
+    pool = ThreadPoolExecutor(max_workers=2)
+
+    render = pdf_cache.render_document
+
+    def render_document(kind, document):
+        rendered.append((kind, document['id'], document['title']))
+        return render(kind, document)
+
+    monkeypatch.setattr(pdf_cache, 'render_document', render_document)
+    monkeypatch.setattr(pdf_cache, 'get_process_pool', lambda: pool)
+    yield rendered
+    pool.shutdown()
+
+
+def test_pdf_is_cached_per_version(app, sign_up, renders):
+    client, _ = sign_up()
+    memo_id = create_memo(client)
+
+    first = client.get(f"/api/memos/{memo_id}/pdf")
+    assert first.status_code == 200
+    assert first.data.startswith(b'%PDF')
+    assert client.get(f"/api/memos/{memo_id}/pdf").data == first.data
+    assert renders == [('memo', memo_id, 'Ring order')]
+
+    assert client.patch(f"/api/memos/{memo_id}", json={'title': 'Edited'}).status_code == 200
+    assert not os.path.exists(pdf_cache.cache_path('memo', memo_id, 1))
+    assert client.get(f"/api/memos/{memo_id}/pdf").status_code == 200
+    assert renders == [('memo', memo_id, 'Ring order'), ('memo', memo_id, 'Edited')]
+    assert os.path.exists(pdf_cache.cache_path('memo', memo_id, 2))
+
+
+def test_concurrent_stores_of_one_file(app):
+    path = pdf_cache.cache_path('memo', 1, 1)
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def store(index):
+        barrier.wait()
+        try:
+            pdf_cache._store(path, bytes([index]) * 4_000_000)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=store, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert len(data) == 4_000_000 and len(set(data)) == 1
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
@@ -0,0 +1,118 @@
+"""
+Every endpoint in QUERY_BUDGETS stays within its statement budget (see
+query_budget.py). Each case first creates what it needs, including the company
+and its number block, and then counts every statement sent to the database
+while the request under test runs.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from config import QUERY_BUDGETS, db
+from conftest import INVOICE, MEMO, create_invoice, create_memo
+
+
+@contextmanager
+def statements():
+    sent = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        yield sent
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+
+def signup(client, sign_up):
+    with statements() as sent:
+        sign_up('bob')
+    return sent
+
+
+def memo_post(client, sign_up):
+    create_memo(client)
+    with statements() as sent:
+        assert client.post('/memos', json=MEMO).status_code == 201
+    return sent
+
+
+def invoice_post(client, sign_up):
+    create_invoice(client)
+    with statements() as sent:
+        assert client.post('/invoices', json=INVOICE).status_code == 201
+    return sent
+
+
+def memo_patch(client, sign_up):
+    memo_id = create_memo(client)
+    with statements() as sent:
+        assert client.patch(f"/api/memos/{memo_id}", json={'title': 'Changed'}).status_code == 200
+    return sent
+
+
+def invoice_patch(client, sign_up):
+    invoice_id = create_invoice(client)
+    with statements() as sent:
+        assert client.patch(f"/api/invoices/{invoice_id}", json={'title': 'Changed'}).status_code == 200
+    return sent
+
+
+def memo_delete(client, sign_up):
+    memo_id = create_memo(client)
+    with statements() as sent:
+        assert client.delete(f"/api/memos/{memo_id}").status_code == 200
+    return sent
+
+
+def invoice_delete(client, sign_up):
+    invoice_id = create_invoice(client)
+    with statements() as sent:
+        assert client.delete(f"/api/invoices/{invoice_id}").status_code == 200
+    return sent
+
+
+def memo_attachment_post(client, sign_up):
+    memo_id = create_memo(client)
+    with statements() as sent:
+        response = client.post(f"/api/memos/{memo_id}/attachments?filename=cert.txt", data=b'certificate',
+                               content_type='text/plain')
+        assert response.status_code == 201
+    return sent
+
+
+def invoice_attachment_post(client, sign_up):
+    invoice_id = create_invoice(client)
+    with statements() as sent:
+        response = client.post(f"/api/invoices/{invoice_id}/attachments?filename=cert.txt", data=b'certificate',
+                               content_type='text/plain')
+        assert response.status_code == 201
+    return sent
+
+
+CASES = {
+    'signup.post': signup,
+    'memos.post': memo_post,
+    'invoices.post': invoice_post,
+    'memobyid.patch': memo_patch,
+    'invoicebyid.patch': invoice_patch,
+    'memobyid.delete': memo_delete,
+    'invoicebyid.delete': invoice_delete,
+    'memoattachments.post': memo_attachment_post,
+    'invoiceattachments.post': invoice_attachment_post,
+}
+
+
+def test_every_budget_has_a_case():
+    assert set(CASES) == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize('endpoint', sorted(CASES))
+def test_endpoint_within_budget(app, sign_up, endpoint):
+    client, _ = sign_up()
+    sent = CASES[endpoint](client, sign_up)
+    budget = app.config['QUERY_BUDGETS'][endpoint]
+    assert len(sent) <= budget, f"{endpoint} sent {len(sent)} statements, budget {budget}:\n" + "\n".join(sent)
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from sqlalchemy import event
+
+from config import db
+from conftest import create_memo
+from read_cache import memo_reads
+
+CONCURRENT_READS = 20
+
+
+def test_concurrent_identical_reads_run_one_query(app, sign_up):
+    client, _ = sign_up()
+    create_memo(client)
+    memo_reads.clear()  # create_memo's own read filled the cache
+    before = memo_reads.stats()
+
+    memo_queries = []
+
+    def slow_memo_query(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT') and 'FROM memos' in statement:
+            memo_queries.append(statement)
+            time.sleep(0.2)  # Keeps the leader in flight while the others arrive
+
+    barrier = threading.Barrier(CONCURRENT_READS)
+    responses = []
+
+    def read():
+        reader = app.test_client()
+        barrier.wait()
+        responses.append(reader.get('/memos', query_string={'company': 'Acme'}))
+
+    event.listen(db.engine, 'before_cursor_execute', slow_memo_query)
+    try:
+        threads = [threading.Thread(target=read) for _ in range(CONCURRENT_READS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', slow_memo_query)
+
+    assert len(memo_queries) == 1
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_READS
+    assert all(response.get_json() == responses[0].get_json() for response in responses)
+    assert len(responses[0].get_json()) == 1
+    after = memo_reads.stats()
+    assert after['misses'] - before['misses'] == 1
+    assert after['coalesced'] - before['coalesced'] == CONCURRENT_READS - 1
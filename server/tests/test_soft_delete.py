@@ -0,0 +1,55 @@
+"""A soft-deleted user's documents and attachments disappear from every read."""
+import os
+
+import pytest
+
+from attachments import thumbnail_path
+from conftest import create_invoice, create_memo
+
+
+@pytest.fixture
+def deleted_user(app, sign_up):
+    """Creates a memo, an invoice and an attachment, then soft-deletes their owner."""
+    client, user = sign_up()
+    memo_id = create_memo(client)
+    create_invoice(client)
+    attachment = client.post(f"/api/memos/{memo_id}/attachments?filename=cert.png", data=b'\x89PNG',
+                             content_type='image/png').get_json()
+    # Stands in for the thumbnail the worker pool would render
+    os.makedirs(os.path.dirname(thumbnail_path(attachment['sha256'])), exist_ok=True)
+    with open(thumbnail_path(attachment['sha256']), 'wb') as f:
+        f.write(b'jpeg')
+    assert client.delete(f"/api/users/{user['id']}").status_code == 200
+    return {'user_id': user['id'], 'memo_id': memo_id, 'attachment_id': attachment['id']}
+
+
+def test_user_lists_are_empty(app, deleted_user):
+    client = app.test_client()
+    user_id = deleted_user['user_id']
+    assert client.get(f"/api/memos/{user_id}/future").get_json() == []
+    assert client.get(f"/api/invoices/{user_id}/future").get_json() == []
+    assert client.get(f"/api/companies/{user_id}").get_json() == []
+
+
+def test_attachments_are_hidden(app, deleted_user):
+    client = app.test_client()
+    attachment_id = deleted_user['attachment_id']
+    assert client.get(f"/api/memos/{deleted_user['memo_id']}/attachments").get_json() == []
+    assert client.get(f"/api/attachments/{attachment_id}").status_code == 404
+    assert client.get(f"/api/attachments/{attachment_id}/thumbnail").status_code == 404
+
+
+def test_sync_sends_tombstones(app, deleted_user):
+    changes = app.test_client().get('/api/sync', query_string={'company': 'Acme', 'since': 0}).get_json()['changes']
+    assert sorted((change['entity'], change['op'], change['data']) for change in changes) == [
+        ('invoice', 'deleted', None),
+        ('memo', 'deleted', None),
+    ]
+
+
+def test_other_users_are_unaffected(app, sign_up, deleted_user):
+    client, user = sign_up('bob')
+    memo_id = create_memo(client)
+    client.post(f"/api/memos/{memo_id}/attachments?filename=cert.txt", data=b'cert', content_type='text/plain')
+    assert client.get(f"/api/companies/{user['id']}").get_json() == ['Acme']
+    assert len(client.get(f"/api/memos/{memo_id}/attachments").get_json()) == 1
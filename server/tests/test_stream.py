@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import stream
+from conftest import create_memo
+
+
+def test_subscription_matches_any_spelling_of_the_company(app, sign_up, monkeypatch):
+    monkeypatch.setattr(stream, 'app', app)
+    client, _ = sign_up()
+    create_memo(client)
+
+    assert stream._canonical_company('  acme ') == 'Acme'
+    assert stream._canonical_company('Globex  Corp') == 'Globex Corp'
+
+    async def publish_to(name):
+        broker = stream.Broker()
+        subscription = broker.subscribe(name)
+        broker.publish({'id': 1, 'company': 'Acme'}, 1)
+        received = subscription.queue.qsize()
+        broker.unsubscribe(subscription)
+        assert broker.subscriptions == {}
+        return received
+
+    assert asyncio.run(publish_to('acme')) == 1
+    assert asyncio.run(publish_to('ACME ')) == 1
+    assert asyncio.run(publish_to('Globex')) == 0
+
+
+def test_late_committing_event_is_still_published():
+    async def deliver():
+        broker = stream.Broker()
+        subscription = broker.subscribe('Acme')
+        # Event 2 commits first while event 1 is still in flight...
+        broker.deliver([{'id': 2, 'company': 'Acme'}], 0)
+        # ...and the next poll, still starting at last_id, sees both
+        broker.deliver([{'id': 1, 'company': 'Acme'}, {'id': 2, 'company': 'Acme'}], 2)
+        received = []
+        while not subscription.queue.empty():
+            event, resume_id = subscription.queue.get_nowait()
+            received.append((event['id'], resume_id))
+        return received, broker
+
+    received, broker = asyncio.run(deliver())
+    assert received == [(2, 0), (1, 1)]
+    assert broker.last_id == 2
+    assert broker.published == set()
+
+
+def test_poll_stays_behind_unsettled_events(app, sign_up, monkeypatch):
+    monkeypatch.setattr(stream, 'app', app)
+    client, _ = sign_up()
+    create_memo(client)
+    create_memo(client)
+
+    events, settled_id = stream._events_after(0)
+    assert settled_id == events[-1]['id']
+
+    monkeypatch.setattr(stream, 'settled_cutoff', lambda: datetime.utcnow() - timedelta(hours=1))
+    events, settled_id = stream._events_after(0)
+    assert len(events) == 2
+    assert settled_id == 0
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import sync
+from conftest import create_memo
+from models import ChangeEvent
+
+
+def _sync(client, since):
+    response = client.get('/api/sync', query_string={'company': 'Acme', 'since': since})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_cursor_does_not_pass_unsettled_events(app, sign_up, monkeypatch):
+    client, _ = sign_up()
+    start = _sync(client, None)['cursor']
+    first = create_memo(client)
+
+    # As on PostgreSQL: events from the last few seconds may have uncommitted
+    # neighbours with lower ids, so they are sent again by the next sync.
+    monkeypatch.setattr(sync, 'settled_cutoff', lambda: datetime.utcnow() - timedelta(hours=1))
+    assert _sync(client, None)['cursor'] == start
+    page = _sync(client, start)
+    assert [change['entity_id'] for change in page['changes']] == [first]
+    assert page['cursor'] == start and not page['has_more']
+
+    # Once settled, the cursor moves past them
+    monkeypatch.setattr(sync, 'settled_cutoff', lambda: datetime.utcnow() + timedelta(hours=1))
+    page = _sync(client, start)
+    assert [change['entity_id'] for change in page['changes']] == [first]
+    assert page['cursor'] > start
+    assert _sync(client, page['cursor'])['changes'] == []
+
+
+def test_sqlite_events_are_settled_at_once(app, sign_up):
+    client, _ = sign_up()
+    create_memo(client)
+    page = _sync(client, 0)
+    assert page['cursor'] == _sync(client, None)['cursor'] > 0
+
+
+def test_events_are_stamped_in_utc(app, sign_up):
+    client, _ = sign_up()
+    before = datetime.utcnow()
+    create_memo(client)
+    after = datetime.utcnow()
+
+    event = ChangeEvent.query.order_by(ChangeEvent.id.desc()).first()
+    assert before <= event.created_at <= after
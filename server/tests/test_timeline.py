@@ -0,0 +1,34 @@
+import base64
+
+import pytest
+
+from conftest import create_invoice, create_memo
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'not json').decode('ascii'),
+    base64.urlsafe_b64encode(b'["2024-01-01T00:00:00", "memo"]').decode('ascii'),
+    base64.urlsafe_b64encode(b'["yesterday", "memo", 3]').decode('ascii'),
+    base64.urlsafe_b64encode(b'[null, "memo", "x"]').decode('ascii'),
+    'é',
+])
+def test_malformed_cursor_is_a_400(app, cursor):
+    response = app.test_client().get('/api/documents', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'invalid cursor'}
+
+
+def test_cursor_pages_through_the_timeline(app, sign_up):
+    client, _ = sign_up()
+    create_memo(client)
+    create_invoice(client)
+    create_memo(client)
+
+    first = client.get('/api/documents', query_string={'limit': 2}).get_json()
+    second = client.get('/api/documents', query_string={'limit': 2, 'cursor': first['next_cursor']}).get_json()
+
+    assert len(first['documents']) == 2
+    assert len(second['documents']) == 1 and second['next_cursor'] is None
+    seen = [(document['type'], document['id']) for document in first['documents'] + second['documents']]
+    assert sorted(seen) == [('invoice', 1), ('memo', 1), ('memo', 2)]
@@ -0,0 +1,65 @@
+"""
+Two PATCHes of the same document race: the second one loads the document,
+then the first one commits (bumping its version) before the second writes.
+"""
+import pytest
+from sqlalchemy import update
+
+import app as app_module
+from config import db
+from conftest import create_invoice, create_memo
+from group_commit import writer
+from models import Invoice, Memo
+
+CASES = [
+    (Memo, create_memo, '/api/memos', 'memo'),
+    (Invoice, create_invoice, '/api/invoices', 'invoice'),
+]
+
+
+def _race_with_other_writer(monkeypatch, model, document_id):
+    """Makes run_write commit a competing update on its own connection first."""
+    run_write = app_module.run_write
+
+    def racing_run_write(operation, *args):
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(model).where(model.id == document_id)
+                .values(title='Theirs', version=model.version + 1)
+            )
+        return run_write(operation, *args)
+
+    monkeypatch.setattr(app_module, 'run_write', racing_run_write)
+
+
+@pytest.mark.parametrize('group_commit', [False, True], ids=['per-request', 'group-commit'])
+@pytest.mark.parametrize('model, create, path, key', CASES, ids=['memo', 'invoice'])
+def test_conflicting_patch_returns_409(app, sign_up, monkeypatch, group_commit, model, create, path, key):
+    client, _ = sign_up()
+    document_id = create(client)
+    app.config['GROUP_COMMIT_ENABLED'] = group_commit
+    _race_with_other_writer(monkeypatch, model, document_id)
+
+    try:
+        response = client.patch(f"{path}/{document_id}", json={'title': 'Mine'})
+    finally:
+        writer.reset()
+
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 2
+    monkeypatch.undo()
+    document = client.get(f"{path}/{document_id}").get_json()
+    assert document['title'] == 'Theirs'
+
+
+@pytest.mark.parametrize('model, create, path, key', CASES, ids=['memo', 'invoice'])
+def test_patch_after_conflict_succeeds(app, sign_up, model, create, path, key):
+    client, _ = sign_up()
+    document_id = create(client)
+    with db.engine.begin() as conn:
+        conn.execute(update(model).where(model.id == document_id).values(version=model.version + 1))
+
+    response = client.patch(f"{path}/{document_id}", json={'title': 'Mine'})
+
+    assert response.status_code == 200
+    assert response.get_json()[key]['title'] == 'Mine'
@@ -0,0 +1,30 @@
+"""
+Thumbnail rendering for image attachments.
+
+Runs inside the shared worker processes (see workers.py), so it only imports
+the standard library up front. Pillow is in the Pipfile; if it is missing no
+thumbnails are made, the attachment endpoints report none and create_app()
+logs a warning (see attachments.init_app).
+"""
+import os
+
+
+def make_thumbnail(source_path, thumbnail_path, size):
+    """
+    Writes a JPEG no larger than size x size to `thumbnail_path`.
+    Returns False when Pillow is not installed or the file is not an image.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+
+    try:
+        with Image.open(source_path) as image:
+            image.thumbnail((size, size))
+            tmp_path = f"{thumbnail_path}.{os.getpid()}.tmp"
+            image.convert('RGB').save(tmp_path, 'JPEG', quality=85)
+    except OSError:
+        return False
+    os.replace(tmp_path, thumbnail_path)
+    return True
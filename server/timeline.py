@@ -0,0 +1,97 @@
+"""
+Unified document timeline across memos and invoices.
+
+One UNION ALL query returns a page of both document types, newest first,
+ordered by (created_at, type, id). Filters and the keyset cursor are applied
+inside each branch, and each branch is limited too, so both branches can use
+the (user_id, created_at) / (company_id, created_at) indexes and read no more than
+one page of rows each.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import false, literal, select, tuple_, union_all
+
+from companies import companies
+from config import db
+from models import Memo, Invoice
+from purge import hide_deleted
+
+
+def encode_cursor(document):
+    raw = json.dumps([document['created_at'], document['type'], document['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, type, id) from a cursor; raises InvalidCursor if it is malformed."""
+    try:
+        created_at, doc_type, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_at), str(doc_type), int(doc_id)
+    except (ValueError, TypeError) as e:
+        # binascii.Error, JSONDecodeError and UnicodeError are ValueErrors
+        raise InvalidCursor() from e
+
+
+def _branch(model, doc_type, number_column, filters, after, limit):
+    query = select(
+        literal(doc_type).label('type'),
+        model.id.label('id'),
+        model.title.label('title'),
+        number_column.label('number'),
+        model.company.label('company'),
+        model.user_id.label('user_id'),
+        model.total_value.label('total_value'),
+        model.created_at.label('created_at'),
+    )
+    if filters.get('user_id') is not None:
+        query = query.where(model.user_id == filters['user_id'])
+    if filters.get('company'):
+        company = companies.lookup(filters['company'])
+        query = query.where(model.company_id == company.id if company else false())
+    if filters.get('since'):
+        query = query.where(model.created_at >= filters['since'])
+    if filters.get('until'):
+        query = query.where(model.created_at < filters['until'])
+    query = hide_deleted(query, model)
+    if after is not None:
+        query = query.where(tuple_(model.created_at, literal(doc_type), model.id) < tuple_(*after))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+
+
+def documents_page(filters, cursor=None, limit=50):
+    """
+    Returns (documents, next_cursor) for one page of the timeline. `filters`
+    may contain user_id, company, since and until (datetimes).
+    """
+    after = decode_cursor(cursor) if cursor else None
+    branches = [
+        _branch(Memo, 'memo', Memo.memo_number, filters, after, limit).subquery().select(),
+        _branch(Invoice, 'invoice', Invoice.invoice_number, filters, after, limit).subquery().select(),
+    ]
+    timeline = union_all(*branches).subquery()
+    query = (
+        select(timeline)
+        .order_by(timeline.c.created_at.desc(), timeline.c.type.desc(), timeline.c.id.desc())
+        .limit(limit)
+    )
+
+    documents = []
+    for row in db.session.execute(query):
+        documents.append({
+            'type': row.type,
+            'id': row.id,
+            'title': row.title,
+            'number': row.number,
+            'company': row.company,
+            'user_id': row.user_id,
+            'total_value': row.total_value,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+        })
+    next_cursor = encode_cursor(documents[-1]) if len(documents) == limit else None
+    return documents, next_cursor
@@ -0,0 +1,37 @@
+"""
+Shared process pool for CPU-bound work (PDF rendering) that must not run on
+request threads.
+
+The pool is created on first use with the spawn start method, so workers never
+inherit the server's threads, sockets or database connections, and a process
+that forks after the pool exists (e.g. a pre-forking server) starts with none.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config['RENDER_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _forget_pool():
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pool)